@@ -0,0 +1,132 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clash_pipeline import (
+    MatrixRules, ExceptionRules, process_clash_file, process_matrix, separacao_de_excecao,
+    separar_layers, agregar_conflitos, relacionar_conflitos_disciplinas,
+)
+from clash_excel import excel_conflitos_por_disciplina
+from clash_txt import criar_txts_por_disciplina
+from gerar_dados import gerar_conjunto, ler_tamanho
+
+# ============================================================
+# Benchmark das etapas do pipeline sobre relatórios sintéticos (veja gerar_dados.py).
+# Cada tamanho é executado duas vezes: uma só com o tempo de cada etapa e outra com o
+# tracemalloc ligado, para o pico de memória (o tracemalloc deixa o código mais lento,
+# por isso não participa da medida de tempo).
+# Uso: python benchmarks/executar.py 1k 10k 100k [--json resultados.json]
+# ============================================================
+
+# ------------------------------------------------------------
+# Função: etapas
+# Propósito: Executa as etapas em sequência, chamando medir(nome, função) em cada uma.
+# ------------------------------------------------------------
+def etapas(relatorio, matriz, saida, medir):
+    clashs, _, problematicos = medir('process_clash_file', lambda: process_clash_file(relatorio))
+    regras_matriz = medir('MatrixRules', lambda: MatrixRules.from_workbook(matriz))
+    regras_excecao = medir('ExceptionRules', lambda: ExceptionRules.from_workbook(matriz))
+    semi_aprovados = medir('process_matrix', lambda: process_matrix(clashs, regras_matriz))
+    aprovados, excecoes = medir('separacao_de_excecao',
+                                lambda: separacao_de_excecao(semi_aprovados, regras_excecao))
+
+    def relacionar():
+        layers = separar_layers(clashs)
+        disciplinas = list(dict.fromkeys(
+            disciplina for clash in semi_aprovados
+            for disciplina in (clash.disciplina_1, clash.disciplina_2) if disciplina))
+        conflitos = relacionar_conflitos_disciplinas(agregar_conflitos(semi_aprovados), None,
+                                                     disciplinas, layers, incluir_vazios=True)
+        return layers, conflitos
+    layers, conflitos = medir('relacionar_conflitos', relacionar)
+
+    medir('excel_conflitos_por_disciplina',
+          lambda: excel_conflitos_por_disciplina(conflitos, layers, saida, aprovados, excecoes))
+    medir('criar_txts_por_disciplina', lambda: criar_txts_por_disciplina(aprovados, saida))
+    return {'clashs': len(clashs), 'problematicos': len(problematicos),
+            'aprovados': len(aprovados), 'excecoes': len(excecoes)}
+
+# ------------------------------------------------------------
+# Função: medir_tamanho
+# Propósito: Tempo (s) e pico de memória (MiB) de cada etapa para um relatório.
+# ------------------------------------------------------------
+def medir_tamanho(relatorio, matriz, memoria=True):
+    resultado = {}
+
+    def medir_tempo(nome, funcao):
+        gc.collect()
+        inicio = time.perf_counter()
+        valor = funcao()
+        resultado.setdefault(nome, {})['segundos'] = time.perf_counter() - inicio
+        return valor
+
+    def medir_memoria(nome, funcao):
+        gc.collect()
+        tracemalloc.reset_peak()
+        atual = tracemalloc.get_traced_memory()[0]
+        valor = funcao()
+        pico = tracemalloc.get_traced_memory()[1] - atual
+        resultado[nome]['pico_mib'] = pico / (1 << 20)
+        return valor
+
+    with tempfile.TemporaryDirectory() as saida:
+        contagens = etapas(relatorio, matriz, saida, medir_tempo)
+    if memoria:
+        tracemalloc.start()
+        try:
+            with tempfile.TemporaryDirectory() as saida:
+                etapas(relatorio, matriz, saida, medir_memoria)
+        finally:
+            tracemalloc.stop()
+    return {'contagens': contagens, 'etapas': resultado}
+
+def _imprimir(quantidade, medida):
+    print(f"\n{quantidade} clashs ({medida['contagens']['clashs']} completos, "
+          f"{medida['contagens']['problematicos']} problemáticos)")
+    print(f"  {'etapa':32} {'tempo (s)':>10} {'pico (MiB)':>11}")
+    for nome, valores in medida['etapas'].items():
+        pico = valores.get('pico_mib')
+        print(f"  {nome:32} {valores['segundos']:10.3f} "
+              f"{'-' if pico is None else f'{pico:.1f}':>11}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mede o tempo e a memória das etapas do pipeline.')
+    parser.add_argument('tamanhos', nargs='*', default=['1k', '10k', '100k'],
+                        help='quantidades de clashs (ex.: 1k 10k 100k 1M)')
+    parser.add_argument('-d', '--dados', default=os.path.join(os.path.dirname(__file__), 'dados'),
+                        help='diretório dos dados sintéticos (gerados se faltarem)')
+    parser.add_argument('--sem-memoria', action='store_true',
+                        help='mede apenas o tempo (sem a passada com tracemalloc)')
+    parser.add_argument('--json', default=None, metavar='ARQUIVO',
+                        help='grava os resultados em JSON, para comparar entre versões')
+    args = parser.parse_args(argv)
+
+    quantidades = [ler_tamanho(tamanho) for tamanho in args.tamanhos]
+    matriz, relatorios = gerar_conjunto(args.dados, quantidades)
+
+    resultados = {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'tamanhos': {},
+    }
+    for quantidade in quantidades:
+        medida = medir_tamanho(relatorios[quantidade], matriz, memoria=not args.sem_memoria)
+        resultados['tamanhos'][str(quantidade)] = medida
+        _imprimir(quantidade, medida)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import argparse
+import os
+import random
+import sys
+
+import openpyxl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clash_pipeline import SIGLAS_DISCIPLINAS
+
+# ============================================================
+# Gerador de dados sintéticos para os benchmarks.
+# Escreve relatórios de clash no formato do Navisworks (blocos Name / Distance /
+# Image Location / HardStatus / Clash Point / Item 1 / Item 2 com Layer, Entity Handle,
+# propriedades CCR_* e Path) e a planilha da matriz com as abas Matriz e exceções.
+# Uso: python benchmarks/gerar_dados.py 1k 10k 100k 1M -o benchmarks/dados
+# ============================================================
+
+# Disciplinas e siglas usadas nos caminhos; J1/001 é a Sinalização Vertical
+DISCIPLINAS = sorted(SIGLAS_DISCIPLINAS.items()) + [('J1', 'Sinalização Vertical')]
+
+# Layers distintos por disciplina
+LAYERS_POR_DISCIPLINA = 40
+
+# Fração dos itens com algum defeito (sem Layer ou com Path fora do padrão)
+FRACAO_DEFEITOS = 0.02
+
+STATUS = ('New', 'Active', 'Reviewed', 'Approved', 'Resolved')
+CLASSES_TUBO = ('', '', '', 'PA-1', 'PA-2', 'PA-3', 'CA-1')
+
+# ------------------------------------------------------------
+# Função: ler_tamanho
+# Propósito: Converte '1k', '100k', '1M' ou '2500' no número de clashs.
+# ------------------------------------------------------------
+def ler_tamanho(texto):
+    texto = texto.strip()
+    multiplicador = {'k': 1000, 'm': 1000000}.get(texto[-1:].lower(), 1)
+    if multiplicador > 1:
+        texto = texto[:-1]
+    return int(float(texto) * multiplicador)
+
+def _layers(sigla):
+    return [f"{sigla}-LAYER_{indice:03d}" for indice in range(LAYERS_POR_DISCIPLINA)]
+
+def _item(sorteio, numero, sigla, layer):
+    handle = f"{sorteio.randint(0x100, 0xFFFFF):X}"
+    linhas = [f"Item {numero}"]
+    if sorteio.random() >= FRACAO_DEFEITOS:
+        linhas.append(f"Layer:\t{layer}")
+    linhas += [
+        f"Entity Handle:\t{handle}",
+        f"Entity Handle Value:\t{handle}",
+        "A_Dados Projeto CCR_DescricaoProjeto:\tProjeto Executivo Sintético",
+        "B_Info Objetos CCR_Disciplina:\t",
+        "C_Propriedade Objetos CCR_Altura:\t",
+        f"E_Requisitos Específicos CCR_ClasseTubo:\t{sorteio.choice(CLASSES_TUBO)}",
+    ]
+    if sorteio.random() >= FRACAO_DEFEITOS:
+        linhas.append(f"Path:\tModelo.nwd>Modelo>RSP-RJ-218-226-ACA-EXE-MB-{sigla}-001-R00.dwg>{layer}>Objeto")
+    else:
+        linhas.append("Path:\tModelo.nwd>Modelo>arquivo_fora_do_padrao.dwg>Objeto")
+    return '\n'.join(linhas) + '\n\n'
+
+# ------------------------------------------------------------
+# Função: gerar_relatorio
+# Propósito: Escreve um relatório com 'quantidade' clashs em 'caminho'.
+# ------------------------------------------------------------
+def gerar_relatorio(caminho, quantidade, semente=1):
+    sorteio = random.Random(semente)
+    nome_teste = os.path.splitext(os.path.basename(caminho))[0]
+    layers = {sigla: _layers(sigla) for sigla, _ in DISCIPLINAS}
+    with open(caminho, 'w', encoding='utf-8', newline='\n', buffering=1 << 20) as arquivo:
+        arquivo.write(f"Clashes\n------------------\nReport Batch\n\n\n{nome_teste} Clash\n"
+                      f"Tolerance:\t0.010m\nTotal:\t{quantidade}\nType:\tHard\nStatus:\tOld\n\n"
+                      "------------------\n\n\n")
+        for indice in range(1, quantidade + 1):
+            sigla_1, _ = sorteio.choice(DISCIPLINAS)
+            sigla_2, _ = sorteio.choice(DISCIPLINAS)
+            arquivo.write(
+                f"Name:\tClash{indice}\n"
+                f"Distance:\t-{sorteio.uniform(0, 1.5):.3f}m\n"
+                f"Image Location:\t{nome_teste}_files\\cd{indice:06d}.jpg\n"
+                f"HardStatus:\t{sorteio.choice(STATUS)}\n"
+                f"Clash Point:\t{sorteio.uniform(620000, 622000):.3f}m, "
+                f"{sorteio.uniform(492000, 495000):.3f}m, {sorteio.uniform(0, 300):.3f}m\n"
+                "Grid Location:\t\nDate Created:\t2023/12/2211:57\n\n")
+            arquivo.write(_item(sorteio, 1, sigla_1, sorteio.choice(layers[sigla_1])))
+            arquivo.write(_item(sorteio, 2, sigla_2, sorteio.choice(layers[sigla_2])))
+            arquivo.write("------------------\n\n\n")
+
+# ------------------------------------------------------------
+# Função: gerar_matriz
+# Propósito: Escreve a planilha da matriz (abas Matriz e exceções) compatível com os
+# relatórios gerados: cerca de metade dos pares de disciplinas permitidos e
+# 'excecoes' regras de exceção, algumas com curingas ('*').
+# ------------------------------------------------------------
+def gerar_matriz(caminho, excecoes=500, semente=1):
+    sorteio = random.Random(semente)
+    nomes = [nome for _, nome in DISCIPLINAS]
+    workbook = openpyxl.Workbook()
+
+    matriz = workbook.active
+    matriz.title = 'Matriz'
+    matriz.append([None, None] + [f"{indice:02d}" for indice in range(1, len(nomes) + 1)])
+    matriz.append([None, 'Categoria'] + nomes)
+    for indice, nome in enumerate(nomes, start=1):
+        matriz.append([f"{indice:02d}", nome] +
+                      [sorteio.choice('OX') for _ in nomes])
+
+    aba = workbook.create_sheet('exceções')
+    aba.append(['Disciplina', 'Layer', 'Disciplina', 'Layer', 'Status'])
+    for _ in range(excecoes):
+        (sigla_1, nome_1), (sigla_2, nome_2) = sorteio.choice(DISCIPLINAS), sorteio.choice(DISCIPLINAS)
+        layer_1 = sorteio.choice(_layers(sigla_1))
+        layer_2 = sorteio.choice(_layers(sigla_2))
+        if sorteio.random() < 0.05:
+            layer_2 = layer_2[:-2] + '*'
+        aba.append([nome_1, layer_1, nome_2, layer_2, 'Aprovado'])
+
+    workbook.save(caminho)
+
+# ------------------------------------------------------------
+# Função: gerar_conjunto
+# Propósito: Gera (se ainda não existirem) o relatório de cada tamanho e a matriz em
+# 'diretorio'. Retorna (matriz, {quantidade: relatório}).
+# ------------------------------------------------------------
+def gerar_conjunto(diretorio, quantidades, semente=1, forcar=False):
+    os.makedirs(diretorio, exist_ok=True)
+    matriz = os.path.join(diretorio, 'matriz_sintetica.xlsx')
+    if forcar or not os.path.exists(matriz):
+        gerar_matriz(matriz, semente=semente)
+    relatorios = {}
+    for quantidade in quantidades:
+        caminho = os.path.join(diretorio, f"relatorio_{quantidade}.txt")
+        if forcar or not os.path.exists(caminho):
+            gerar_relatorio(caminho, quantidade, semente=semente)
+        relatorios[quantidade] = caminho
+    return matriz, relatorios
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera relatórios de clash e matriz sintéticos.')
+    parser.add_argument('tamanhos', nargs='*', default=['1k', '10k', '100k', '1M'],
+                        help='quantidades de clashs (ex.: 1k 10k 100k 1M)')
+    parser.add_argument('-o', '--saida', default=os.path.join(os.path.dirname(__file__), 'dados'),
+                        help='diretório dos arquivos gerados')
+    parser.add_argument('--semente', type=int, default=1)
+    parser.add_argument('--forcar', action='store_true', help='gera de novo arquivos já existentes')
+    args = parser.parse_args(argv)
+
+    matriz, relatorios = gerar_conjunto(args.saida, [ler_tamanho(t) for t in args.tamanhos],
+                                        semente=args.semente, forcar=args.forcar)
+    print(matriz)
+    for caminho in relatorios.values():
+        print(caminho)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import datetime
+import os
+import sqlite3
+
+from clash_colunar import TAMANHO_LOTE, em_lotes, linhas_clashs
+from clash_pipeline import carregar_regras
+
+# ============================================================
+# Banco SQLite com os clashs de todas as execuções.
+# Cada execução é registrada em 'execucoes'; o estado mais recente de cada clash fica
+# em 'clashs' (chave: teste de clash + nome do clash) e o estado em cada execução fica
+# em 'historico'. Assim perguntas como "quando este clash foi aprovado?" ou "quantos
+# clashs de Drenagem X OAEs existiam em cada semana?" são respondidas por índice.
+# ============================================================
+
+# Versão do esquema do banco (PRAGMA user_version)
+_VERSAO_BANCO = 1
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS execucoes (
+    execucao INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    matriz TEXT,
+    relatorios INTEGER NOT NULL DEFAULT 0,
+    clashs INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS clashs (
+    teste TEXT NOT NULL,
+    name TEXT NOT NULL,
+    id TEXT,
+    status TEXT,
+    distancia REAL,
+    x REAL, y REAL, z REAL,
+    disciplina_1 TEXT, disciplina_2 TEXT,
+    layer_1 TEXT, layer_2 TEXT,
+    entity_1 TEXT, entity_2 TEXT,
+    completo INTEGER NOT NULL,
+    matriz INTEGER,
+    excecao INTEGER,
+    primeira_execucao INTEGER NOT NULL REFERENCES execucoes(execucao),
+    ultima_execucao INTEGER NOT NULL REFERENCES execucoes(execucao),
+    PRIMARY KEY (teste, name)
+);
+CREATE TABLE IF NOT EXISTS historico (
+    execucao INTEGER NOT NULL REFERENCES execucoes(execucao),
+    teste TEXT NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT,
+    distancia REAL,
+    matriz INTEGER,
+    excecao INTEGER,
+    PRIMARY KEY (execucao, teste, name)
+);
+CREATE INDEX IF NOT EXISTS clashs_disciplinas ON clashs (disciplina_1, disciplina_2);
+CREATE INDEX IF NOT EXISTS clashs_layers ON clashs (layer_1, layer_2);
+CREATE INDEX IF NOT EXISTS clashs_entity_1 ON clashs (entity_1);
+CREATE INDEX IF NOT EXISTS clashs_entity_2 ON clashs (entity_2);
+CREATE INDEX IF NOT EXISTS clashs_ultima_execucao ON clashs (ultima_execucao);
+CREATE INDEX IF NOT EXISTS historico_clash ON historico (teste, name);
+"""
+
+_UPSERT_CLASH = """
+INSERT INTO clashs (teste, name, id, status, distancia, x, y, z,
+                    disciplina_1, disciplina_2, layer_1, layer_2, entity_1, entity_2,
+                    completo, matriz, excecao, primeira_execucao, ultima_execucao)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (teste, name) DO UPDATE SET
+    id = excluded.id, status = excluded.status, distancia = excluded.distancia,
+    x = excluded.x, y = excluded.y, z = excluded.z,
+    disciplina_1 = excluded.disciplina_1, disciplina_2 = excluded.disciplina_2,
+    layer_1 = excluded.layer_1, layer_2 = excluded.layer_2,
+    entity_1 = excluded.entity_1, entity_2 = excluded.entity_2,
+    completo = excluded.completo, matriz = excluded.matriz, excecao = excluded.excecao,
+    ultima_execucao = excluded.ultima_execucao
+"""
+
+_INSERT_HISTORICO = """
+INSERT OR REPLACE INTO historico (execucao, teste, name, status, distancia, matriz, excecao)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# ------------------------------------------------------------
+# Função: abrir_banco
+# Propósito: Abre (ou cria) o banco SQLite e garante as tabelas e os índices.
+# ------------------------------------------------------------
+def abrir_banco(caminho):
+    conexao = sqlite3.connect(caminho)
+    conexao.execute('PRAGMA journal_mode = WAL')
+    conexao.execute('PRAGMA synchronous = NORMAL')
+    conexao.execute('PRAGMA foreign_keys = ON')
+    versao = conexao.execute('PRAGMA user_version').fetchone()[0]
+    if versao > _VERSAO_BANCO:
+        conexao.close()
+        raise RuntimeError(f"O banco {caminho} foi criado por uma versão mais nova "
+                           f"(esquema {versao}).")
+    with conexao:
+        conexao.executescript(_ESQUEMA)
+        conexao.execute(f'PRAGMA user_version = {_VERSAO_BANCO}')
+    return conexao
+
+# ------------------------------------------------------------
+# Função: gravar_execucao
+# Propósito: Registra uma execução lendo de novo os relatórios (uso avulso, fora do
+# pipeline). O teste de clash é o nome do arquivo do relatório, sem extensão. Retorna
+# o número da execução. O pipeline grava as listas que já classificou (veja
+# gravar_linhas e a opção 'banco' de run_pipeline/run_batch).
+# ------------------------------------------------------------
+def gravar_execucao(banco, relatorios, matrix_path=None, tamanho_lote=TAMANHO_LOTE):
+    """
+    'banco' é o caminho do arquivo SQLite ou uma conexão já aberta com abrir_banco.
+    Com 'matrix_path' (planilha ou tupla (MatrixRules, ExceptionRules)), grava também o
+    veredito da matriz e das exceções de cada clash.
+    """
+    if isinstance(relatorios, (str, os.PathLike)):
+        relatorios = [relatorios]
+    relatorios = list(relatorios)
+    if matrix_path is None or isinstance(matrix_path, tuple):
+        regras = matrix_path
+        nome_matriz = None
+    else:
+        regras = carregar_regras(matrix_path)
+        nome_matriz = os.path.abspath(matrix_path)
+    return gravar_linhas(banco, linhas_clashs(relatorios, regras), nome_matriz,
+                         len(relatorios), tamanho_lote)
+
+# ------------------------------------------------------------
+# Função: gravar_linhas
+# Propósito: Registra uma execução com as linhas dos clashs (na ordem de
+# clash_colunar.COLUNAS, completos e problemáticos), em uma única transação e com
+# inserções em lote (executemany). Retorna o número da execução.
+# ------------------------------------------------------------
+def gravar_linhas(banco, linhas, nome_matriz=None, relatorios=0, tamanho_lote=TAMANHO_LOTE):
+    conexao = banco if isinstance(banco, sqlite3.Connection) else abrir_banco(banco)
+    try:
+        with conexao:  # Uma transação: ou a execução entra inteira, ou não entra
+            cursor = conexao.execute(
+                'INSERT INTO execucoes (data, matriz, relatorios) VALUES (?, ?, ?)',
+                (datetime.datetime.now().isoformat(timespec='seconds'), nome_matriz, relatorios))
+            execucao = cursor.lastrowid
+
+            total = 0
+            # Registros sem 'Name:' não têm como ser identificados entre as execuções
+            linhas = (linha for linha in linhas if linha[1])
+            for lote in em_lotes(linhas, tamanho_lote):
+                # Linhas na ordem de clash_colunar.COLUNAS: o relatório é o teste de clash
+                conexao.executemany(_UPSERT_CLASH,
+                                    [linha + (execucao, execucao) for linha in lote])
+                conexao.executemany(_INSERT_HISTORICO,
+                                    [(execucao, linha[0], linha[1], linha[3], linha[4],
+                                      linha[15], linha[16]) for linha in lote])
+                total += len(lote)
+
+            conexao.execute('UPDATE execucoes SET clashs = ? WHERE execucao = ?', (total, execucao))
+    finally:
+        if conexao is not banco:
+            conexao.close()
+    return execucao
+
+# ------------------------------------------------------------
+# Função: historico_clash
+# Propósito: Estados de um clash em cada execução, da mais antiga à mais recente, como
+# tuplas (execucao, data, status, distancia, matriz, excecao).
+# ------------------------------------------------------------
+def historico_clash(conexao, teste, name):
+    return conexao.execute(
+        'SELECT h.execucao, e.data, h.status, h.distancia, h.matriz, h.excecao '
+        'FROM historico h JOIN execucoes e ON e.execucao = h.execucao '
+        'WHERE h.teste = ? AND h.name = ? ORDER BY h.execucao',
+        (teste, name)).fetchall()
@@ -0,0 +1,248 @@
+import argparse
+import math
+import sys
+
+from clash_pipeline import (
+    diretorio_cache_relatorios, expandir_relatorios, iter_clashes, ler_relatorio, run_batch,
+    run_pipeline,
+)
+
+# ============================================================
+# Linha de comando do pipeline de clashs, para rodar sem interface gráfica (servidores,
+# agendadores): python -m clash_cli (ou python -m clash_pipeline) com os comandos
+# processar, lote, consultar, exportar e propriedades.
+# ============================================================
+
+# ------------------------------------------------------------
+# Função: _progresso_terminal
+# Propósito: Cria o callback de progresso da linha de comando (escreve no stderr).
+# Dentro de uma mesma etapa só escreve a cada 10%, para não poluir o terminal.
+# ------------------------------------------------------------
+def _progresso_terminal():
+    ultimo = (None, None)
+    def progresso(percentual, mensagem):
+        nonlocal ultimo
+        if mensagem != ultimo[1] or percentual // 10 != ultimo[0] // 10:
+            print(f"[{percentual:3d}%] {mensagem}", file=sys.stderr)
+            ultimo = (percentual, mensagem)
+    return progresso
+
+# ------------------------------------------------------------
+# Função: consultar_clashs
+# Propósito: Comando 'consultar' da linha de comando: monta o índice espacial dos
+# clashs dos relatórios e imprime o resultado da consulta (raio, caixa ou vizinhos).
+# ------------------------------------------------------------
+def consultar_clashs(args):
+    # O índice espacial depende do NumPy, importado apenas quando é usado
+    from clash_espacial import IndiceEspacial, formatar_clash
+
+    relatorios = expandir_relatorios(args.relatorios)
+    if not relatorios:
+        raise SystemExit(f"Nenhum relatório de clash encontrado em: {args.relatorios}")
+    clashs = []
+    for caminho in relatorios:
+        completos, _, problematicos = ler_relatorio(caminho, args.cache_dir)
+        clashs.extend(completos)
+        if args.incluir_problematicos:
+            clashs.extend(problematicos)
+    indice = IndiceEspacial(clashs)
+
+    if args.raio:
+        x, y, raio = args.raio
+        resultado = indice.raio(x, y, raio, z=args.z)
+    elif args.vizinhos:
+        x, y, k = args.vizinhos
+        resultado = indice.vizinhos(x, y, int(k), z=args.z)
+    else:
+        resultado = [(None, clash) for clash in indice.caixa(*args.caixa, zmin=args.zmin, zmax=args.zmax)]
+
+    print('ID\tNome\tX\tY\tZ\tObjetos\tLayer1\tLayer2' + ('' if args.caixa else '\tDistancia'))
+    for distancia, clash in resultado:
+        print(formatar_clash(clash, distancia))
+    print(f"{len(resultado)} clashs encontrados de {len(indice)} indexados", file=sys.stderr)
+    return 0
+
+def exportar_tabela(args):
+    # O Parquet depende do pyarrow, importado apenas quando é usado
+    from clash_colunar import exportar_clashs
+
+    relatorios = expandir_relatorios(args.relatorios)
+    if not relatorios:
+        raise SystemExit(f"Nenhum relatório de clash encontrado em: {args.relatorios}")
+    try:
+        total = exportar_clashs(relatorios, args.saida, args.matriz, formato=args.formato)
+    except (RuntimeError, ValueError) as erro:
+        raise SystemExit(str(erro))
+    print(f"{total} clashs exportados para {args.saida}", file=sys.stderr)
+    return 0
+
+# ------------------------------------------------------------
+# Função: contar_propriedades
+# Propósito: Comando 'propriedades' da linha de comando: lê as propriedades dos itens
+# (CCR_*) para a tabela colunar e imprime a quantidade de clashs por valor da
+# propriedade pedida, ou o resumo das colunas encontradas.
+# ------------------------------------------------------------
+def contar_propriedades(args):
+    from clash_propriedades import TabelaPropriedades
+
+    relatorios = expandir_relatorios(args.relatorios)
+    if not relatorios:
+        raise SystemExit(f"Nenhum relatório de clash encontrado em: {args.relatorios}")
+    tabela = TabelaPropriedades(filtro=args.filtro)
+    for caminho in relatorios:
+        # Os clashs em si não são guardados: a tabela mantém só os que têm propriedades
+        for _ in iter_clashes(caminho, propriedades=tabela):
+            pass
+
+    if args.por is None:
+        print('Propriedade\tItens\tValores')
+        for nome, itens, valores in tabela.resumo():
+            print(f"{nome}\t{itens}\t{valores}")
+        return 0
+    if not tabela.colunas_de(args.por):
+        raise SystemExit(f"Propriedade não encontrada nos relatórios: {args.por}")
+    print(f"{args.por}\tClashs")
+    for valor, quantidade in tabela.contar_clashs_por(args.por).most_common():
+        print(f"{valor}\t{quantidade}")
+    return 0
+
+def _distancia_positiva(texto):
+    """Tipo do --dedup-distancia: número finito maior que zero."""
+    try:
+        valor = float(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"distância inválida: {texto!r}")
+    if not (math.isfinite(valor) and valor > 0):
+        raise argparse.ArgumentTypeError(f"a distância deve ser maior que zero: {texto!r}")
+    return valor
+
+def _argumentos_dedup(subparser):
+    subparser.add_argument('--dedup', action='store_true',
+                           help='remove clashs repetidos do mesmo par de objetos (entity handles)')
+    subparser.add_argument('--dedup-distancia', type=_distancia_positiva, default=None, metavar='METROS',
+                           help='com --dedup, une apenas os clashs do mesmo par a até METROS '
+                                'de distância (implica --dedup)')
+
+def _argumentos_dxf(subparser):
+    subparser.add_argument('--dxf', action='store_true',
+                           help="grava também um desenho DXF por disciplina com um bloco 'clash' "
+                                "por clash (abre ou anexa como XREF direto no AutoCAD)")
+
+def _argumentos_banco(subparser):
+    subparser.add_argument('--banco', default=None, metavar='ARQUIVO',
+                           help='grava a execução e todos os clashs no banco SQLite ARQUIVO '
+                                '(criado se não existir), com o histórico entre execuções')
+
+def _argumentos_cache(subparser):
+    subparser.add_argument('--cache', dest='cache_dir', default=diretorio_cache_relatorios(),
+                           help='diretório do cache de relatórios já processados '
+                                '(padrão: %(default)s)')
+    subparser.add_argument('--sem-cache', dest='cache_dir', action='store_const', const=None,
+                           help='processa todos os relatórios sem usar o cache')
+
+# ------------------------------------------------------------
+# Função: main
+# Propósito: Linha de comando para rodar o pipeline sem interface gráfica, por exemplo
+# em servidores ou agendadores:
+#   python -m clash_pipeline processar relatorio.txt "Matriz Clashs.xlsx" saida/
+# ------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='clash_pipeline',
+        description='Processa relatórios de clash do Navisworks sem interface gráfica.')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    processar = subparsers.add_parser('processar', help='processa um relatório de clash (.txt ou .xml)')
+    processar.add_argument('relatorio', help='arquivo de clash (.txt ou .xml) exportado pelo Navisworks')
+    processar.add_argument('matriz', help='planilha da matriz (.xlsx) com as abas Matriz e exceções')
+    processar.add_argument('saida', help='diretório de saída')
+    processar.add_argument('-j', '--workers', type=int, default=None,
+                           help='processos na leitura de relatórios grandes (padrão: número de núcleos)')
+    processar.add_argument('-q', '--quiet', action='store_true', help='não mostra o andamento')
+    _argumentos_cache(processar)
+    _argumentos_dedup(processar)
+    _argumentos_dxf(processar)
+    _argumentos_banco(processar)
+
+    lote = subparsers.add_parser('lote', help='processa em paralelo vários relatórios de clash')
+    lote.add_argument('relatorios', nargs='+', help='diretórios, padrões glob ou arquivos .txt/.xml')
+    lote.add_argument('-m', '--matriz', required=True, help='planilha da matriz (.xlsx)')
+    lote.add_argument('-o', '--saida', required=True, help='diretório de saída')
+    lote.add_argument('-j', '--workers', type=int, default=None,
+                      help='número de processos (padrão: número de núcleos)')
+    lote.add_argument('-q', '--quiet', action='store_true', help='não mostra o andamento')
+    _argumentos_cache(lote)
+    _argumentos_dedup(lote)
+    _argumentos_dxf(lote)
+    _argumentos_banco(lote)
+
+    consultar = subparsers.add_parser('consultar', help='consulta espacial dos pontos de clash')
+    consultar.add_argument('relatorios', nargs='+', help='diretórios, padrões glob ou arquivos .txt/.xml')
+    consulta = consultar.add_mutually_exclusive_group(required=True)
+    consulta.add_argument('--raio', nargs=3, type=float, metavar=('X', 'Y', 'R'),
+                          help='clashs a até R metros do ponto (X, Y)')
+    consulta.add_argument('--caixa', nargs=4, type=float, metavar=('XMIN', 'YMIN', 'XMAX', 'YMAX'),
+                          help='clashs dentro do retângulo')
+    consulta.add_argument('--vizinhos', nargs=3, type=float, metavar=('X', 'Y', 'K'),
+                          help='os K clashs mais próximos do ponto (X, Y)')
+    consultar.add_argument('-z', type=float, default=None,
+                           help='cota do ponto consultado (distância 3D em --raio/--vizinhos)')
+    consultar.add_argument('--zmin', type=float, default=None, help='cota mínima em --caixa')
+    consultar.add_argument('--zmax', type=float, default=None, help='cota máxima em --caixa')
+    consultar.add_argument('--incluir-problematicos', action='store_true',
+                           help='inclui os clashs com informações faltantes que tenham coordenadas')
+    _argumentos_cache(consultar)
+
+    exportar = subparsers.add_parser('exportar',
+                                     help='exporta a tabela de clashs em Parquet ou CSV')
+    exportar.add_argument('relatorios', nargs='+', help='diretórios, padrões glob ou arquivos .txt/.xml')
+    exportar.add_argument('-o', '--saida', required=True,
+                          help='arquivo de saída (.parquet ou .csv)')
+    exportar.add_argument('-m', '--matriz', default=None,
+                          help='planilha da matriz (.xlsx), para incluir o veredito da matriz e das exceções')
+    exportar.add_argument('--formato', choices=('parquet', 'csv'), default=None,
+                          help='formato do arquivo (padrão: pela extensão da saída)')
+
+    propriedades = subparsers.add_parser(
+        'propriedades', help='conta os clashs por propriedade dos itens (CCR_*)')
+    propriedades.add_argument('relatorios', nargs='+', help='diretórios, padrões glob ou arquivos .txt/.xml')
+    propriedades.add_argument('--por', default=None, metavar='PROPRIEDADE',
+                              help="propriedade agrupada, pelo nome completo ou final (ex.: CCR_ClasseTubo); "
+                                   "sem ela, lista as propriedades encontradas")
+    propriedades.add_argument('--filtro', default='CCR_',
+                              help='texto que as propriedades guardadas contêm (padrão: %(default)s)')
+
+    args = parser.parse_args(argv)
+    progresso = None if getattr(args, 'quiet', False) else _progresso_terminal()
+
+    if args.comando == 'consultar':
+        return consultar_clashs(args)
+    if args.comando == 'exportar':
+        return exportar_tabela(args)
+    if args.comando == 'propriedades':
+        return contar_propriedades(args)
+
+    if args.comando in ('processar', 'lote'):
+        if args.comando == 'processar':
+            resumo = run_pipeline(args.relatorio, args.matriz, args.saida, progress=progresso,
+                                  cache_dir=args.cache_dir, dedup=args.dedup,
+                                  dedup_distancia=args.dedup_distancia, workers=args.workers,
+                                  dxf=args.dxf, banco=args.banco)
+        else:
+            resumo = run_batch(args.relatorios, args.matriz, args.saida,
+                               workers=args.workers, progress=progresso, cache_dir=args.cache_dir,
+                               dedup=args.dedup, dedup_distancia=args.dedup_distancia,
+                               dxf=args.dxf, banco=args.banco)
+            print("Relatórios:", resumo['relatorios'])
+        print("Clashes Totais:", resumo['totais'])
+        print("Clashes Aprovados:", resumo['aprovados'])
+        print("Clashes Exceções:", resumo['excecoes'])
+        print("Clashes Problemáticos:", resumo['problematicos'])
+        if args.dedup or args.dedup_distancia is not None:
+            print("Clashes Duplicados:", resumo['duplicados'])
+        if args.banco:
+            print(f"Execução {resumo['execucao']} gravada em {args.banco}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import csv
+import os
+import tempfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Sem pyarrow a exportação fica restrita ao CSV
+    pa = pq = None
+
+from clash_pipeline import carregar_regras, is_clash_complete, iter_clashes
+
+# ============================================================
+# Exportação da tabela completa de clashs em formato colunar.
+# Os clashs saem direto do parser (iter_clashes) em lotes de linhas, de modo que
+# relatórios com milhões de clashs são exportados sem montar a lista inteira na memória:
+# - Parquet (requer pyarrow): cada lote vira um row group do arquivo
+# - CSV: alternativa sem dependências, com as coordenadas como números
+# ============================================================
+
+# Colunas exportadas, na ordem do arquivo
+COLUNAS = ('relatorio', 'name', 'id', 'status', 'distancia', 'x', 'y', 'z',
+           'disciplina_1', 'disciplina_2', 'layer_1', 'layer_2', 'entity_1', 'entity_2',
+           'completo', 'matriz', 'excecao')
+
+# Linhas por row group (Parquet) / por escrita (CSV)
+TAMANHO_LOTE = 65536
+
+if pa is not None:
+    ESQUEMA = pa.schema([
+        ('relatorio', pa.string()), ('name', pa.string()), ('id', pa.string()),
+        ('status', pa.string()), ('distancia', pa.float64()),
+        ('x', pa.float64()), ('y', pa.float64()), ('z', pa.float64()),
+        ('disciplina_1', pa.string()), ('disciplina_2', pa.string()),
+        ('layer_1', pa.string()), ('layer_2', pa.string()),
+        ('entity_1', pa.string()), ('entity_2', pa.string()),
+        ('completo', pa.bool_()), ('matriz', pa.bool_()), ('excecao', pa.bool_()),
+    ])
+
+# ------------------------------------------------------------
+# Função: linhas_clashs
+# Propósito: Gera uma tupla (na ordem de COLUNAS) por clash dos relatórios, com o
+# veredito da matriz e das exceções. 'matriz' e 'excecao' ficam vazios (None) nos clashs
+# problemáticos e 'excecao' também nos clashs reprovados pela matriz, como no pipeline.
+# ------------------------------------------------------------
+def linhas_clashs(relatorios, regras=None):
+    regras_matriz, regras_excecao = regras if regras is not None else (None, None)
+    for caminho in relatorios:
+        nome_relatorio = os.path.splitext(os.path.basename(caminho))[0]
+        for clash in iter_clashes(caminho):
+            completo = is_clash_complete(clash)
+            aprovado = excecao = None
+            if completo and regras_matriz is not None:
+                aprovado = regras_matriz.permitido(clash.disciplina_1, clash.disciplina_2)
+                if aprovado:
+                    excecao = regras_excecao.eh_excecao((clash.layer_1 or '').strip(),
+                                                        (clash.layer_2 or '').strip())
+            yield _linha(nome_relatorio, clash, completo, aprovado, excecao)
+
+def _linha(nome_relatorio, clash, completo, aprovado, excecao):
+    return (nome_relatorio, clash.name, clash.id, clash.status, clash.distancia,
+            clash.x, clash.y, clash.z, clash.disciplina_1, clash.disciplina_2,
+            clash.layer_1, clash.layer_2, clash.entity_1, clash.entity_2,
+            completo, aprovado, excecao)
+
+# ------------------------------------------------------------
+# Função: linhas_classificadas
+# Propósito: As mesmas linhas de linhas_clashs, mas a partir das listas que uma execução
+# do pipeline já leu e classificou (sem ler os relatórios de novo). 'relatorio' é o
+# nome do relatório ou uma função clash -> nome (modo lote).
+# ------------------------------------------------------------
+def linhas_classificadas(clashs, clashs_problematicos, clash_semi_aprovados, clashs_excecoes,
+                         relatorio):
+    nome = relatorio if callable(relatorio) else (lambda clash: relatorio)
+    semi_aprovados = {id(clash) for clash in clash_semi_aprovados}
+    excecoes = {id(clash) for clash in clashs_excecoes}
+    for clash in clashs:
+        aprovado = id(clash) in semi_aprovados
+        yield _linha(nome(clash), clash, True, aprovado,
+                     (id(clash) in excecoes) if aprovado else None)
+    for clash in clashs_problematicos:
+        yield _linha(nome(clash), clash, False, None, None)
+
+# ------------------------------------------------------------
+# Função: em_lotes
+# Propósito: Agrupa as linhas em listas de até 'tamanho' linhas.
+# ------------------------------------------------------------
+def em_lotes(linhas, tamanho):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+# ------------------------------------------------------------
+# Função: formato_exportacao
+# Propósito: Decide o formato pela extensão do arquivo ('.parquet' ou '.csv'); sem
+# extensão conhecida usa Parquet quando o pyarrow está instalado.
+# ------------------------------------------------------------
+def formato_exportacao(caminho, formato=None):
+    if formato is None:
+        extensao = os.path.splitext(caminho)[1].lower()
+        if extensao in ('.parquet', '.pq'):
+            formato = 'parquet'
+        elif extensao == '.csv':
+            formato = 'csv'
+        else:
+            formato = 'parquet' if pq is not None else 'csv'
+    if formato == 'parquet' and pq is None:
+        raise RuntimeError("A exportação em Parquet requer o pacote pyarrow; "
+                           "instale-o ou exporte em CSV.")
+    if formato not in ('parquet', 'csv'):
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    return formato
+
+def _gravar_parquet(lotes, arquivo):
+    with pq.ParquetWriter(arquivo, ESQUEMA, compression='zstd') as escritor:
+        for lote in lotes:
+            colunas = list(zip(*lote))
+            tabela = pa.Table.from_arrays(
+                [pa.array(coluna, type=campo.type) for coluna, campo in zip(colunas, ESQUEMA)],
+                schema=ESQUEMA)
+            escritor.write_table(tabela, row_group_size=len(lote))
+
+def _gravar_csv(lotes, arquivo):
+    with open(arquivo, 'w', encoding='utf-8', newline='') as saida:
+        escritor = csv.writer(saida)
+        escritor.writerow(COLUNAS)
+        for lote in lotes:
+            # Valores ausentes viram campo vazio; booleanos viram 1/0
+            escritor.writerows(
+                ['' if valor is None else int(valor) if isinstance(valor, bool) else valor
+                 for valor in linha]
+                for linha in lote)
+
+# ------------------------------------------------------------
+# Função: exportar_clashs
+# Propósito: Exporta todos os clashs dos relatórios (completos e problemáticos) para
+# 'caminho'. Com 'matrix_path' (planilha ou tupla (MatrixRules, ExceptionRules)), inclui
+# o veredito da matriz e das exceções. O arquivo é gravado em um temporário e só
+# substitui o destino no fim. Retorna o número de clashs exportados.
+# ------------------------------------------------------------
+def exportar_clashs(relatorios, caminho, matrix_path=None, formato=None, tamanho_lote=TAMANHO_LOTE):
+    formato = formato_exportacao(caminho, formato)
+    if isinstance(relatorios, (str, os.PathLike)):
+        relatorios = [relatorios]
+    if matrix_path is None or isinstance(matrix_path, tuple):
+        regras = matrix_path
+    else:
+        regras = carregar_regras(matrix_path)
+
+    total = 0
+    def contar(lotes):
+        nonlocal total
+        for lote in lotes:
+            total += len(lote)
+            yield lote
+
+    lotes = contar(em_lotes(linhas_clashs(relatorios, regras), tamanho_lote))
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    fd, temporario = tempfile.mkstemp(dir=diretorio, suffix='.tmp')
+    os.close(fd)
+    try:
+        if formato == 'parquet':
+            _gravar_parquet(lotes, temporario)
+        else:
+            _gravar_csv(lotes, temporario)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.remove(temporario)
+        raise
+    return total
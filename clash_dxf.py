@@ -0,0 +1,299 @@
+import os
+import uuid
+from collections import defaultdict
+
+from clash_pipeline import como_clash
+
+# ============================================================
+# Exportação dos clashs em DXF (R12, ASCII), um desenho por disciplina.
+# Alternativa ao lisp_test/criar2.lsp (que lê o TXT da disciplina e insere bloco a bloco
+# dentro do AutoCAD) e ao autocad_handler (um círculo por chamada COM): o arquivo já
+# traz a definição do bloco 'clash' e todos os INSERTs com os atributos, e pode ser
+# aberto ou anexado como XREF de uma vez, sem AutoCAD e em qualquer sistema.
+#
+# Os atributos seguem a ordem e o conteúdo que o criar2.lsp preenche:
+# Objetos, ID, Entity1, Entity2, Layer1 e Layer2.
+# ============================================================
+
+# Nome do bloco e layer dos marcadores
+NOME_BLOCO = 'clash'
+LAYER_MARCADORES = 'CLASH'
+
+# Raio do círculo do marcador e altura do texto dos atributos (unidades do desenho)
+RAIO_MARCADOR = 0.5
+ALTURA_TEXTO = 0.25
+
+# Atributos do bloco: (tag, prompt, visível); a posição é relativa ao ponto de inserção
+ATRIBUTOS = (
+    ('OBJETOS', 'Objetos', False),
+    ('ID', 'ID do clash', True),
+    ('ENTITY1', 'Entity handle 1', False),
+    ('ENTITY2', 'Entity handle 2', False),
+    ('LAYER1', 'Layer 1', False),
+    ('LAYER2', 'Layer 2', False),
+)
+_DESLOCAMENTO_X = RAIO_MARCADOR + 0.2
+_ESPACAMENTO_Y = ALTURA_TEXTO * 1.5
+
+def _posicao_atributo(indice):
+    return _DESLOCAMENTO_X, RAIO_MARCADOR - indice * _ESPACAMENTO_Y
+
+# ------------------------------------------------------------
+# Função: _texto_dxf
+# Propósito: Prepara um texto para um valor de grupo DXF: sem quebras de linha e com os
+# caracteres fora da página de código ANSI_1252 escritos como \U+XXXX.
+# ------------------------------------------------------------
+def _texto_dxf(texto):
+    texto = str(texto).replace('\r', ' ').replace('\n', ' ')
+    try:
+        texto.encode('cp1252')
+        return texto
+    except UnicodeEncodeError:
+        return ''.join(ch if _em_cp1252(ch) else f"\\U+{ord(ch):04X}" for ch in texto)
+
+def _em_cp1252(ch):
+    try:
+        ch.encode('cp1252')
+        return True
+    except UnicodeEncodeError:
+        return False
+
+def _grupos(*pares):
+    """Texto DXF de pares (código, valor), uma linha para cada um."""
+    return ''.join(f"{codigo:>3}\n{valor}\n" for codigo, valor in pares)
+
+def _numero(valor):
+    return f"{valor:.6f}"
+
+# ------------------------------------------------------------
+# Função: cabecalho_dxf
+# Propósito: Seções HEADER, TABLES e BLOCKS do desenho (com a definição do bloco 'clash')
+# e a abertura da seção ENTITIES. 'extensao', se informada, é ((xmin, ymin, zmin),
+# (xmax, ymax, zmax)) dos marcadores, para o desenho abrir já enquadrado.
+# ------------------------------------------------------------
+def cabecalho_dxf(extensao=None):
+    partes = [_grupos((0, 'SECTION'), (2, 'HEADER'),
+                      (9, '$ACADVER'), (1, 'AC1009'),
+                      (9, '$DWGCODEPAGE'), (3, 'ANSI_1252'),
+                      (9, '$INSBASE'), (10, '0.0'), (20, '0.0'), (30, '0.0'))]
+    if extensao is not None:
+        minimo, maximo = extensao
+        partes.append(_grupos((9, '$EXTMIN'), (10, _numero(minimo[0] - RAIO_MARCADOR)),
+                              (20, _numero(minimo[1] - RAIO_MARCADOR)), (30, _numero(minimo[2])),
+                              (9, '$EXTMAX'), (10, _numero(maximo[0] + RAIO_MARCADOR)),
+                              (20, _numero(maximo[1] + RAIO_MARCADOR)), (30, _numero(maximo[2]))))
+    partes.append(_grupos((0, 'ENDSEC')))
+
+    # Tabelas: tipo de linha, layers (0 e o dos marcadores, em vermelho) e estilo de texto
+    partes.append(_grupos(
+        (0, 'SECTION'), (2, 'TABLES'),
+        (0, 'TABLE'), (2, 'LTYPE'), (70, 1),
+        (0, 'LTYPE'), (2, 'CONTINUOUS'), (70, 0), (3, 'Solid line'), (72, 65), (73, 0), (40, '0.0'),
+        (0, 'ENDTAB'),
+        (0, 'TABLE'), (2, 'LAYER'), (70, 2),
+        (0, 'LAYER'), (2, '0'), (70, 0), (62, 7), (6, 'CONTINUOUS'),
+        (0, 'LAYER'), (2, LAYER_MARCADORES), (70, 0), (62, 1), (6, 'CONTINUOUS'),
+        (0, 'ENDTAB'),
+        (0, 'TABLE'), (2, 'STYLE'), (70, 1),
+        (0, 'STYLE'), (2, 'STANDARD'), (70, 0), (40, '0.0'), (41, '1.0'), (50, '0.0'), (71, 0),
+        (42, _numero(ALTURA_TEXTO)), (3, 'txt'), (4, ''),
+        (0, 'ENDTAB'),
+        (0, 'ENDSEC')))
+
+    # Bloco 'clash': círculo no ponto de inserção e os atributos (flag 2 = bloco com atributos)
+    partes.append(_grupos(
+        (0, 'SECTION'), (2, 'BLOCKS'),
+        (0, 'BLOCK'), (8, '0'), (2, NOME_BLOCO), (70, 2), (10, '0.0'), (20, '0.0'), (30, '0.0'),
+        (3, NOME_BLOCO),
+        (0, 'CIRCLE'), (8, '0'), (10, '0.0'), (20, '0.0'), (30, '0.0'), (40, _numero(RAIO_MARCADOR))))
+    for indice, (tag, prompt, visivel) in enumerate(ATRIBUTOS):
+        dx, dy = _posicao_atributo(indice)
+        partes.append(_grupos(
+            (0, 'ATTDEF'), (8, '0'), (10, _numero(dx)), (20, _numero(dy)), (30, '0.0'),
+            (40, _numero(ALTURA_TEXTO)), (1, ''), (3, prompt), (2, tag), (70, 0 if visivel else 1)))
+    partes.append(_grupos((0, 'ENDBLK'), (8, '0'), (0, 'ENDSEC'),
+                          (0, 'SECTION'), (2, 'ENTITIES')))
+    return ''.join(partes)
+
+# Fechamento da seção ENTITIES e do arquivo
+RODAPE_DXF = _grupos((0, 'ENDSEC'), (0, 'EOF'))
+
+# ------------------------------------------------------------
+# Função: valores_atributos
+# Propósito: Valores dos atributos do bloco para um clash, no mesmo formato das linhas
+# que o criar2.lsp lê do TXT da disciplina.
+# ------------------------------------------------------------
+def valores_atributos(clash):
+    return (
+        f"Objetos: {clash.disciplina_1 or ''} X {clash.disciplina_2 or ''}",
+        clash.id or '',
+        f"Entity1: {clash.entity_1 or ''}".strip(),
+        f"Entity2: {clash.entity_2 or ''}".strip(),
+        f"Layer1: {clash.layer_1 or ''}".strip(),
+        f"Layer2: {clash.layer_2 or ''}".strip(),
+    )
+
+# Texto fixo do INSERT e de cada ATTRIB, montado uma vez; por clash só entram os valores
+_MODELO_INSERT = _grupos((0, 'INSERT'), (8, LAYER_MARCADORES), (66, 1), (2, NOME_BLOCO),
+                         (10, '{}'), (20, '{}'), (30, '{}'))
+_MODELOS_ATTRIB = tuple(
+    (_posicao_atributo(indice),
+     _grupos((0, 'ATTRIB'), (8, LAYER_MARCADORES), (10, '{}'), (20, '{}'), (30, '{}'),
+             (40, _numero(ALTURA_TEXTO)), (1, '{}'), (2, tag), (70, 0 if visivel else 1)))
+    for indice, (tag, _, visivel) in enumerate(ATRIBUTOS))
+_SEQEND = _grupos((0, 'SEQEND'), (8, LAYER_MARCADORES))
+
+# ------------------------------------------------------------
+# Função: insert_dxf
+# Propósito: Texto DXF do INSERT do bloco 'clash' no ponto do clash, com os ATTRIBs e o
+# SEQEND. Os atributos ficam na posição (absoluta) definida no bloco.
+# ------------------------------------------------------------
+def insert_dxf(clash):
+    x, y, z = clash.x, clash.y, clash.z
+    texto_z = _numero(z)
+    partes = [_MODELO_INSERT.format(clash.coord_x, clash.coord_y, clash.coord_z)]
+    for ((dx, dy), modelo), valor in zip(_MODELOS_ATTRIB, valores_atributos(clash)):
+        partes.append(modelo.format(_numero(x + dx), _numero(y + dy), texto_z, _texto_dxf(valor)))
+    partes.append(_SEQEND)
+    return ''.join(partes)
+
+# ------------------------------------------------------------
+# Função: extensoes_por_disciplina
+# Propósito: Extensão ((xmin, ymin, zmin), (xmax, ymax, zmax)) dos clashs com coordenadas
+# de cada disciplina, para o cabeçalho de cada desenho.
+# ------------------------------------------------------------
+def extensoes_por_disciplina(clashs):
+    extensoes = {}
+    for clash in map(como_clash, clashs):
+        if clash.x is None:
+            continue
+        for disciplina in {clash.disciplina_1, clash.disciplina_2}:
+            if not disciplina:
+                continue
+            atual = extensoes.get(disciplina)
+            if atual is None:
+                extensoes[disciplina] = ([clash.x, clash.y, clash.z], [clash.x, clash.y, clash.z])
+                continue
+            minimo, maximo = atual
+            for eixo, valor in enumerate((clash.x, clash.y, clash.z)):
+                if valor < minimo[eixo]:
+                    minimo[eixo] = valor
+                elif valor > maximo[eixo]:
+                    maximo[eixo] = valor
+    return extensoes
+
+# ------------------------------------------------------------
+# Classe: EscritorDxfDisciplinas
+# Propósito: Escrever os desenhos DXF por disciplina de uma execução, como o
+# EscritorTxtDisciplinas faz com os TXTs: um arquivo bufferizado por disciplina, gravado
+# em um temporário e renomeado para '<disciplina>.dxf' no final (escrita atômica).
+# ------------------------------------------------------------
+class EscritorDxfDisciplinas:
+    """
+    Escritor dos DXFs por disciplina. Use como gerenciador de contexto:
+
+        with EscritorDxfDisciplinas(diretorio_saida, extensoes) as escritor:
+            for clash in clashs:
+                escritor.escrever(clash)
+
+    Cada clash entra uma vez no desenho de cada uma das suas disciplinas (pelo ID, ou
+    pelo par (relatório, ID) com 'relatorio', como nos TXTs). Clashs sem coordenadas não
+    têm onde ser inseridos e são apenas contados em 'sem_coordenadas'. Se ocorrer um
+    erro, os temporários são descartados. Com 'saidas' (SaidasPendentes), os desenhos
+    fechados só são publicados junto com as demais saídas da execução.
+    """
+
+    def __init__(self, diretorio_saida, extensoes=None, buffer=1 << 20, relatorio=None,
+                 saidas=None):
+        os.makedirs(diretorio_saida, exist_ok=True)
+        self.diretorio_saida = diretorio_saida
+        self.extensoes = extensoes or {}
+        self.buffer = buffer
+        self.relatorio = relatorio
+        self.saidas = saidas
+        self._arquivos = {}  # disciplina -> (arquivo aberto, caminho temporário)
+        self.clashs_contados = defaultdict(set)
+        self.sem_coordenadas = 0
+
+    def _arquivo(self, disciplina):
+        aberto = self._arquivos.get(disciplina)
+        if aberto is None:
+            if self.saidas is not None:
+                temporario = self.saidas.temporario(f"{disciplina}.dxf")
+            else:
+                temporario = os.path.join(self.diretorio_saida, f".{disciplina}.{uuid.uuid4().hex}.tmp")
+            # DXF R12 em ANSI_1252 (veja _texto_dxf), com quebras de linha do Windows
+            arquivo = open(temporario, 'w', encoding='cp1252', newline='\r\n', buffering=self.buffer)
+            aberto = self._arquivos[disciplina] = (arquivo, temporario)
+            arquivo.write(cabecalho_dxf(self.extensoes.get(disciplina)))
+        return aberto[0]
+
+    def escrever(self, clash):
+        clash = como_clash(clash)
+        id_clash = clash.id or ''
+        chave = id_clash if self.relatorio is None else (self.relatorio(clash), id_clash)
+        pendentes = [disciplina for disciplina in (clash.disciplina_1, clash.disciplina_2)
+                     if disciplina and chave not in self.clashs_contados[disciplina]]
+        if not pendentes:
+            return
+        if clash.x is None:
+            self.sem_coordenadas += 1
+            return
+
+        conteudo = insert_dxf(clash)
+        for disciplina in pendentes:
+            if chave not in self.clashs_contados[disciplina]:
+                self._arquivo(disciplina).write(conteudo)
+                self.clashs_contados[disciplina].add(chave)
+
+    def fechar(self):
+        """Fecha as seções dos desenhos e os renomeia para '<disciplina>.dxf' (com 'saidas', deixa pendentes)."""
+        arquivos, self._arquivos = self._arquivos, {}
+        for disciplina, (arquivo, temporario) in arquivos.items():
+            arquivo.write(RODAPE_DXF)
+            arquivo.close()
+            if self.saidas is None:
+                os.replace(temporario, os.path.join(self.diretorio_saida, f"{disciplina}.dxf"))
+
+    def descartar(self):
+        """Fecha e apaga os temporários, sem tocar nos arquivos finais."""
+        arquivos, self._arquivos = self._arquivos, {}
+        for arquivo, temporario in arquivos.values():
+            arquivo.close()
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        if tipo is None:
+            self.fechar()
+        else:
+            self.descartar()
+        return False
+
+# Intervalo (em clashs) entre os avisos de andamento da escrita
+_CLASHS_POR_AVISO = 8192
+
+# ------------------------------------------------------------
+# Função: criar_dxfs_por_disciplina
+# Propósito: Escreve um desenho DXF por disciplina com um bloco 'clash' para cada clash.
+# Retorna a quantidade de blocos inseridos (um clash conta uma vez por disciplina).
+# As extensões exigem uma primeira passada, então um gerador é materializado antes.
+# 'relatorio' (clashs de vários relatórios) e 'saidas' são repassados ao
+# EscritorDxfDisciplinas.
+# ------------------------------------------------------------
+def criar_dxfs_por_disciplina(clashs, diretorio_saida, progresso=None, relatorio=None,
+                              saidas=None):
+    if not hasattr(clashs, '__len__'):
+        clashs = list(clashs)
+    with EscritorDxfDisciplinas(diretorio_saida, extensoes_por_disciplina(clashs),
+                                relatorio=relatorio, saidas=saidas) as escritor:
+        for indice, clash in enumerate(clashs):
+            if progresso is not None and indice % _CLASHS_POR_AVISO == 0:
+                progresso(indice, len(clashs))
+            escritor.escrever(clash)
+    return sum(len(ids) for ids in escritor.clashs_contados.values())
@@ -0,0 +1,143 @@
+import math
+
+import numpy as np
+
+# ============================================================
+# Índice espacial dos pontos de clash (Clash Point X, Y, Z).
+# Os pontos ficam em arrays NumPy organizados em uma grade uniforme no plano XY,
+# o que permite responder em milissegundos perguntas como:
+# - Quais clashs estão a menos de 50 m deste ponto? (IndiceEspacial.raio)
+# - Quais clashs estão dentro desta caixa? (IndiceEspacial.caixa)
+# - Quais são os k clashs mais próximos deste ponto? (IndiceEspacial.vizinhos)
+# ============================================================
+
+# ------------------------------------------------------------
+# Classe: IndiceEspacial
+# Propósito: Grade uniforme em XY sobre os pontos dos clashs. Os índices dos pontos são
+# ordenados pela célula da grade, de modo que cada coluna de células consultada vira
+# uma fatia contígua do array (duas buscas binárias).
+# ------------------------------------------------------------
+class IndiceEspacial:
+    """
+    Índice espacial sobre uma lista de clashs (objetos Clash).
+
+    Clashs sem coordenadas são ignorados. As consultas retornam listas de Clash; as
+    consultas por raio e de vizinhos retornam pares (distância, clash) ordenados pela
+    distância. Quando 'z' não é informado, a distância é medida apenas no plano XY.
+    """
+
+    def __init__(self, clashs, tamanho_celula=None):
+        self.clashs = [clash for clash in clashs if clash.x is not None]
+        n = len(self.clashs)
+        self.pontos = np.array([(clash.x, clash.y, clash.z) for clash in self.clashs],
+                               dtype=np.float64).reshape(n, 3)
+
+        if n:
+            self._origem = self.pontos[:, :2].min(axis=0)
+            extensao = self.pontos[:, :2].max(axis=0) - self._origem
+        else:
+            self._origem = np.zeros(2)
+            extensao = np.zeros(2)
+
+        if tamanho_celula is None:
+            # Em média cerca de 4 pontos por célula
+            area = float(extensao[0] * extensao[1])
+            if area > 0:
+                tamanho_celula = 2 * math.sqrt(area / n)
+            else:
+                tamanho_celula = float(extensao.max()) / max(n, 1) or 1.0
+        self.tamanho_celula = float(tamanho_celula)
+
+        self._nx = int(extensao[0] // self.tamanho_celula) + 1
+        self._ny = int(extensao[1] // self.tamanho_celula) + 1
+        celulas = self._celulas(self.pontos[:, 0], self.pontos[:, 1])
+        chaves = celulas[:, 0] * self._ny + celulas[:, 1]
+        self._ordem = np.argsort(chaves, kind='stable')
+        self._chaves = chaves[self._ordem]
+
+    def __len__(self):
+        return len(self.clashs)
+
+    def _celulas(self, x, y):
+        xy = np.column_stack((np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)))
+        return np.floor((xy - self._origem) / self.tamanho_celula).astype(np.int64)
+
+    def _candidatos(self, xmin, ymin, xmax, ymax):
+        """Índices dos pontos nas células que cobrem o retângulo [xmin, xmax] x [ymin, ymax]."""
+        (i0, j0), (i1, j1) = self._celulas([xmin, xmax], [ymin, ymax])
+        i0, i1 = max(i0, 0), min(i1, self._nx - 1)
+        j0, j1 = max(j0, 0), min(j1, self._ny - 1)
+        if i0 > i1 or j0 > j1:
+            return np.empty(0, dtype=np.int64)
+        fatias = []
+        for i in range(i0, i1 + 1):
+            inicio = np.searchsorted(self._chaves, i * self._ny + j0, side='left')
+            fim = np.searchsorted(self._chaves, i * self._ny + j1, side='right')
+            if fim > inicio:
+                fatias.append(self._ordem[inicio:fim])
+        return np.concatenate(fatias) if fatias else np.empty(0, dtype=np.int64)
+
+    def _distancias(self, indices, x, y, z):
+        delta = self.pontos[indices, :2] - (x, y)
+        quadrado = (delta ** 2).sum(axis=1)
+        if z is not None:
+            quadrado += (self.pontos[indices, 2] - z) ** 2
+        return np.sqrt(quadrado)
+
+    def _raio_indices(self, x, y, raio, z=None):
+        indices = self._candidatos(x - raio, y - raio, x + raio, y + raio)
+        distancias = self._distancias(indices, x, y, z)
+        dentro = distancias <= raio
+        indices, distancias = indices[dentro], distancias[dentro]
+        ordem = np.argsort(distancias, kind='stable')
+        return indices[ordem], distancias[ordem]
+
+    def raio(self, x, y, raio, z=None):
+        """Clashs a até 'raio' do ponto, como pares (distância, clash) do mais próximo ao mais distante."""
+        indices, distancias = self._raio_indices(x, y, raio, z)
+        return [(float(d), self.clashs[i]) for i, d in zip(indices, distancias)]
+
+    def caixa(self, xmin, ymin, xmax, ymax, zmin=None, zmax=None):
+        """Clashs dentro da caixa (limites inclusivos); zmin/zmax são opcionais."""
+        indices = np.sort(self._candidatos(xmin, ymin, xmax, ymax))
+        pontos = self.pontos[indices]
+        dentro = ((pontos[:, 0] >= xmin) & (pontos[:, 0] <= xmax) &
+                  (pontos[:, 1] >= ymin) & (pontos[:, 1] <= ymax))
+        if zmin is not None:
+            dentro &= pontos[:, 2] >= zmin
+        if zmax is not None:
+            dentro &= pontos[:, 2] <= zmax
+        return [self.clashs[i] for i in indices[dentro]]
+
+    def vizinhos(self, x, y, k=1, z=None):
+        """Os k clashs mais próximos do ponto, como pares (distância, clash)."""
+        k = min(k, len(self.clashs))
+        if k <= 0:
+            return []
+        # Distância máxima possível até algum ponto: cobre o ponto consultado e toda a grade
+        extensao = np.array([self._nx, self._ny]) * self.tamanho_celula
+        alcance = float(np.hypot(*(np.abs((x, y) - self._origem) + extensao)))
+        if z is not None:
+            alcance = math.hypot(alcance, float(np.abs(self.pontos[:, 2] - z).max()))
+
+        # Busca por raios crescentes: a busca por raio é exata, então quando ela já
+        # encontra k pontos, eles são os k mais próximos
+        raio = self.tamanho_celula
+        while True:
+            indices, distancias = self._raio_indices(x, y, raio, z)
+            if len(indices) >= k or raio >= alcance:
+                break
+            raio *= 2
+        return [(float(d), self.clashs[i]) for i, d in zip(indices[:k], distancias[:k])]
+
+# ------------------------------------------------------------
+# Função: formatar_clash
+# Propósito: Linha de texto (separada por tabulações) de um clash no resultado das consultas.
+# ------------------------------------------------------------
+def formatar_clash(clash, distancia=None):
+    campos = [clash.id or '', clash.name or '', clash.coord_x, clash.coord_y, clash.coord_z,
+              f"{clash.disciplina_1 or ''} X {clash.disciplina_2 or ''}",
+              clash.layer_1 or '', clash.layer_2 or '']
+    if distancia is not None:
+        campos.append(f"{distancia:.3f}")
+    return '\t'.join(campos)
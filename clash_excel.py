@@ -0,0 +1,187 @@
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, PatternFill, Border, Side
+
+from clash_pipeline import agregar_conflitos, par_canonico
+
+# ============================================================
+# Planilha de conflitos entre disciplinas ('lista_conflitos_disciplinas.xlsx'): para
+# cada par de disciplinas, o total de conflitos e os pares de layers com a contagem, o
+# status (ativo/aprovado) e o ID do primeiro clash. A planilha é gravada em modo
+# streaming (write-only do openpyxl).
+# ============================================================
+
+# ------------------------------------------------------------
+# Função: _estilos_relatorio
+# Propósito: Cria os estilos nomeados da planilha de conflitos (preenchimentos e bordas),
+# aplicados célula a célula enquanto as linhas são emitidas.
+# ------------------------------------------------------------
+def _estilos_relatorio(workbook):
+    thin_border = Border(left=Side(style='thin'),
+                         right=Side(style='thin'),
+                         top=Side(style='thin'),
+                         bottom=Side(style='thin'))
+    cores = {
+        'conflitos_borda': None,
+        'conflitos_soma': "D8E4BC",
+        'conflitos_disciplinas': "DCE6F1",
+        'conflitos_contagem': "CCC0DA",
+        'conflitos_layers': "FDE9D9",
+    }
+    for nome, cor in cores.items():
+        estilo = NamedStyle(name=nome, border=thin_border)
+        if cor:
+            estilo.fill = PatternFill(start_color=cor, end_color=cor, fill_type="solid")
+        workbook.add_named_style(estilo)
+
+# ------------------------------------------------------------
+# Função: calcular_status_por_par
+# Propósito: Pré-calcula, para cada par de layers (sem ordem), o status do conflito e o ID
+# do primeiro clash correspondente: "ativo" se houver clash aprovado, senão "aprovado"
+# se houver clash na lista de exceções.
+# ------------------------------------------------------------
+def calcular_status_por_par(aprovado, excecao):
+    # 'aprovado' e 'excecao' podem ser listas de clashs ou agregados de agregar_conflitos
+    # (ou de _agregar_codigos, e então as chaves são pares de códigos)
+    agregado_aprovado = aprovado if isinstance(aprovado, dict) else agregar_conflitos(aprovado)
+    agregado_excecao = excecao if isinstance(excecao, dict) else agregar_conflitos(excecao)
+
+    status_por_par = {}
+    for chave, estatistica in agregado_aprovado.items():
+        status_por_par[chave] = ("ativo", estatistica.primeiro_id or '')
+    for chave, estatistica in agregado_excecao.items():
+        atual = status_por_par.get(chave)
+        # Exceções só valem quando não há clash aprovado com ID para o par
+        if atual is None or not atual[1]:
+            status_por_par[chave] = ("aprovado", estatistica.primeiro_id or '')
+    return status_por_par
+
+# ------------------------------------------------------------
+# Função: gravar_planilha_conflitos
+# Propósito: Escreve a planilha de conflitos em modo streaming (write-only do openpyxl):
+# cada linha já sai com seu estilo e não fica na memória. 'grupos' gera, para cada par
+# de disciplinas, (disciplina 1, disciplina 2, total, linhas), com as linhas no formato
+# (layer da disciplina 1, layer da disciplina 2, contagem, status, ID do clash).
+# Com 'saidas' (SaidasPendentes), a planilha é publicada junto com as demais saídas.
+# ------------------------------------------------------------
+def gravar_planilha_conflitos(grupos, quantidade, saida, progresso=None, saidas=None):
+    # Cria uma planilha Excel em modo streaming, com os estilos nomeados
+    workbook = openpyxl.Workbook(write_only=True)
+    _estilos_relatorio(workbook)
+    aba = workbook.create_sheet()
+
+    # Estilização das colunas (deve ser definida antes de escrever as linhas)
+    if quantidade:
+        aba.column_dimensions['A'].width = 30
+        aba.column_dimensions['B'].width = 30
+        aba.column_dimensions['C'].width = 15
+        aba.column_dimensions['D'].width = 15
+        aba.column_dimensions['E'].width = 40
+        aba.column_dimensions['F'].width = 20
+
+    def linha(valores, estilo_a='conflitos_borda', estilo_c='conflitos_borda'):
+        # Todas as linhas de um grupo têm borda fina de A até F
+        celulas = []
+        for indice, valor in enumerate(valores + [None] * (6 - len(valores))):
+            celula = WriteOnlyCell(aba, value=valor)
+            celula.style = estilo_a if indice == 0 else estilo_c if indice == 2 else 'conflitos_borda'
+            celulas.append(celula)
+        return celulas
+
+    # Configura os títulos das colunas fixos no cabeçalho (linha 1)
+    aba.append([None, None, None, 'Status', 'Justificativa', 'Imagem'])
+
+    # Variável que controla a numeração das linhas na planilha
+    row_num = 2
+
+    try:
+        # Itera sobre cada par de disciplinas e os respectivos conflitos
+        for indice_par, (disciplina1, disciplina2, total, linhas) in enumerate(grupos):
+            if progresso is not None:
+                progresso(indice_par, quantidade)
+
+            # Adiciona os títulos das colunas para cada par de disciplinas com mesclagem
+            aba.merged_cells.add(f'A{row_num}:B{row_num}')
+            aba.append(linha(['Disciplinas', None, 'Soma'], 'conflitos_disciplinas', 'conflitos_soma'))
+            row_num += 1
+
+            # Grava os nomes das disciplinas e o total de conflitos na primeira linha do grupo
+            aba.append(linha([disciplina1, disciplina2, total]))
+            row_num += 1
+
+            # Se houver detalhes de conflitos (camadas específicas), insere um cabeçalho para os detalhes
+            if linhas:
+                aba.merged_cells.add(f'A{row_num}:B{row_num}')
+                aba.append(linha(['Layers', None, 'Contagem', 'Status', 'Justificativa', 'Imagem'],
+                                 'conflitos_layers', 'conflitos_contagem'))
+                row_num += 1
+
+            for layer1, layer2, contagem, status, clash_id in linhas:
+                aba.append(linha([layer1, layer2, contagem, status, None, clash_id]))
+                row_num += 1  # Avança para a próxima linha
+
+            # Adiciona uma linha em branco para separar os grupos de conflitos entre disciplinas
+            aba.append([])
+            row_num += 1
+    except BaseException:
+        # Erro ou cancelamento no meio da planilha: fecha a aba em streaming para
+        # liberar o arquivo temporário do openpyxl (nada é gravado na saída)
+        aba.close()
+        raise
+
+    # Salva a planilha no diretório de saída especificado com o nome 'lista_conflitos_disciplinas.xlsx'
+    if saidas is not None:
+        workbook.save(saidas.temporario('lista_conflitos_disciplinas.xlsx'))
+    else:
+        workbook.save(f'{saida}/lista_conflitos_disciplinas.xlsx')
+
+# ------------------------------------------------------------
+# Função: grupos_planilha_codigos
+# Propósito: Grupos da planilha a partir do resultado de _relacionar_codigos. Os textos
+# dos layers e das disciplinas são resolvidos aqui, grupo a grupo, durante a escrita.
+# ------------------------------------------------------------
+def grupos_planilha_codigos(relacionados, layers_por_disciplina, status_por_par, simbolos):
+    layers = simbolos.layers.textos
+    disciplinas = simbolos.disciplinas.textos
+    conjuntos = {disciplina: set(codigos) for disciplina, codigos in layers_por_disciplina.items()}
+    for (disciplina1, disciplina2), grupo in relacionados:
+        layers_disciplina1 = conjuntos.get(disciplina1, ())
+        linhas = []
+        for (layer1, layer2), contagem in grupo['conflitos'].items():
+            # Status e ID do primeiro clash do par, já pré-calculados
+            chave = (layer1, layer2) if layer1 <= layer2 else (layer2, layer1)
+            status, clash_id = status_por_par.get(chave, ("", ""))
+            # O layer da disciplina 1 vai na primeira coluna
+            if layer1 not in layers_disciplina1:
+                layer1, layer2 = layer2, layer1
+            linhas.append((layers[layer1], layers[layer2], contagem, status, clash_id))
+        yield disciplinas[disciplina1], disciplinas[disciplina2], grupo['total'], linhas
+
+# ------------------------------------------------------------
+# Função: excel_conflitos_por_disciplina
+# Propósito: Gerar uma planilha Excel listando os conflitos (layers e contagens)
+# organizados por pares de disciplinas. A planilha é gravada em modo streaming
+# (write-only do openpyxl): cada linha já sai com seu estilo e não fica na memória.
+# ------------------------------------------------------------
+def excel_conflitos_por_disciplina(conflitos_por_disciplina, dicionario_layer_disciplina, saida, aprovado, excecao,
+                                   progresso=None):
+    status_por_par = calcular_status_por_par(aprovado, excecao)
+    layers_por_disciplina = {disciplina: set(layers) for disciplina, layers in dicionario_layer_disciplina.items()}
+
+    def grupos():
+        for disciplinas_chave, conflitos in conflitos_por_disciplina.items():
+            # Separa as duas disciplinas usando o separador ' x '
+            disciplina1, disciplina2 = disciplinas_chave.split(' x ')
+            layers_disciplina1 = layers_por_disciplina.get(disciplina1, ())
+            linhas = []
+            for layer_conflito, contagem in conflitos['conflitos'].items():
+                # Cada chave 'layer_conflito' contém os dois layers separados por '%'
+                layer1, layer2 = layer_conflito.split('%')
+                status, clash_id = status_por_par.get(par_canonico(layer1, layer2), ("", ""))
+                # Verifica qual layer pertence à disciplina 1 para manter a consistência na ordenação
+                if layer1 not in layers_disciplina1:
+                    layer1, layer2 = layer2, layer1
+                linhas.append((layer1, layer2, contagem, status, clash_id))
+            yield disciplina1, disciplina2, conflitos['total'], linhas
+
+    gravar_planilha_conflitos(grupos(), len(conflitos_por_disciplina), saida, progresso)
@@ -0,0 +1,1904 @@
+import glob
+import hashlib
+import io
+import json
+import math
+import mmap
+import os
+import pickle
+import re
+import sys
+import tempfile
+import time
+import uuid
+from array import array
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+
+import openpyxl
+
+# ============================================================
+# Pipeline de processamento de Clashs, sem dependência de interface gráfica.
+# Este módulo contém as etapas para:
+# - Processar o arquivo de clash e extrair informações
+# - Validar e separar os clashs (aprovados, com exceção, problemáticos)
+# - Gerar arquivos de texto e planilhas de Excel com os resultados
+# A escrita das saídas fica em clash_txt (TXTs por disciplina e defeitos), clash_excel
+# (planilha de conflitos) e clash_dxf; a linha de comando fica em clash_cli. A interface
+# Tkinter (Clash_Analizer.py) e a linha de comando usam a mesma função run_pipeline.
+# ============================================================
+
+# Mapeamento básico das siglas para as disciplinas
+SIGLAS_DISCIPLINAS = {
+    'C1': 'Topografia',
+    'F1': 'Geometria',
+    'G1': 'Terraplenagem',
+    'H2': 'Drenagem',
+    'J2': 'Dispositivos de Segurança',
+    'I2': 'Pavimentação',
+    'L2': 'OAEs',
+    'K2': 'Iluminação',
+    'L4': 'Contenções',
+    'M1': 'Interferências',
+    'Q1': 'Desapropriação',
+    'N2': 'Paisagismo',
+    'Z9': 'Geral'
+}
+
+# Padrão do caminho: ignora as partes antes dos dois primeiros '>', descarta os sete
+# campos seguintes separados por '-' (valrsp, valrj, val218, val226, valaca, valexe, valmb)
+# e captura a sigla da disciplina (valfinal) e o número do desenho (numdps).
+_RE_DISCIPLINA = re.compile(r'[^>]*>[^>]*>(?:[^-]*-){7}([^-]*)-([^-]*)-')
+
+# Marca de caminho fora do padrão (diferente de None, que é sigla desconhecida)
+_FALHA_EXTRACAO = object()
+
+# Contadores das extrações que falharam. Antes as falhas eram apenas impressas;
+# agora ficam contadas por motivo ('formato' e 'sigla_desconhecida').
+falhas_extracao = Counter()
+
+@lru_cache(maxsize=4096)
+def _disciplina_por_prefixo(prefixo):
+    m = _RE_DISCIPLINA.match(prefixo)
+    if m is None:
+        return _FALHA_EXTRACAO
+    valfinal = m.group(1).strip()
+    numdps = m.group(2).strip()
+    # Tratamento especial para 'J1'
+    if valfinal == 'J1' and numdps == '001':
+        return 'Sinalização Vertical'
+    return SIGLAS_DISCIPLINAS.get(valfinal)
+
+# ------------------------------------------------------------
+# Função: extract_disciplina
+# Propósito: Extrai a disciplina a partir de uma linha do caminho (linha que começa com "Path:")
+# Usa uma expressão regular pré-compilada e um cache LRU indexado pelo prefixo do caminho,
+# já que os mesmos prefixos se repetem milhares de vezes em um relatório.
+# ------------------------------------------------------------
+def extract_disciplina(linha):
+    """
+    Extrai a disciplina a partir de uma linha do caminho (linha que começa com "Path:").
+    Retorna a disciplina associada, ou None caso não consiga extrair; nesse caso a
+    falha é contabilizada em falhas_extracao.
+    """
+    # O prefixo vai até o terceiro '>' (arquivo onde está a sigla da disciplina)
+    pos = -1
+    for _ in range(3):
+        pos = linha.find('>', pos + 1)
+        if pos < 0:
+            break
+    disciplina = _disciplina_por_prefixo(linha if pos < 0 else linha[:pos])
+
+    # Se a sigla não está no prefixo, o padrão pode atravessar o terceiro '>'
+    if disciplina is _FALHA_EXTRACAO and pos >= 0:
+        disciplina = _disciplina_por_prefixo.__wrapped__(linha)
+
+    if disciplina is _FALHA_EXTRACAO:
+        falhas_extracao['formato'] += 1
+        return None
+    if disciplina is None:
+        falhas_extracao['sigla_desconhecida'] += 1
+    return disciplina
+
+# Casas decimais (x, y, z) já vistas, compartilhadas entre os clashs
+_SEM_CASAS = (0, 0, 0)
+_CASAS_COMPARTILHADAS = {_SEM_CASAS: _SEM_CASAS}
+
+# ------------------------------------------------------------
+# Classe: Clash
+# Propósito: Registro compacto de um clash. Usa __slots__ em vez de um dicionário
+# por clash, guarda as coordenadas já convertidas para float e compartilha as
+# strings de disciplinas e layers entre todos os registros.
+# ------------------------------------------------------------
+class Clash:
+    """
+    Registro de um clash do relatório do Navisworks.
+
+    As coordenadas ficam em x, y e z (float) e as strings repetidas (disciplinas,
+    layers, pasta das imagens) são referências compartilhadas. Para quem ainda
+    trata o clash como dicionário, o objeto oferece uma visão compatível:
+    clash['coord_x'], clash.get('layer_1', ''), 'disciplina_1' in clash, etc.
+    Campos ausentes valem None e não aparecem nessa visão.
+    """
+    __slots__ = ('name', 'id', 'status', 'distancia', 'x', 'y', 'z', 'casas', '_coord_txt',
+                 'disciplina_1', 'disciplina_2', 'entity_1', 'entity_2',
+                 'layer_1', 'layer_2', '_img_pre', '_img_suf')
+
+    # Chaves da visão de dicionário, na mesma ordem do antigo registro em dict
+    CHAVES = ('name', 'image_loc', 'id', 'coord_x', 'coord_y', 'coord_z', 'coordinates',
+              'disciplina_1', 'disciplina_2', 'entity_1', 'entity_2', 'layer_1', 'layer_2')
+
+    # Campos por trás das CHAVES: bastam para o teste de verdade e a comparação, sem
+    # formatar coordenadas nem montar a visão de dicionário
+    _CAMPOS = ('name', 'id', '_img_pre', '_img_suf', 'x', 'y', 'z', 'casas', '_coord_txt',
+               'disciplina_1', 'disciplina_2', 'entity_1', 'entity_2', 'layer_1', 'layer_2')
+
+    def __init__(self, name=None):
+        self.name = name
+        self.id = None
+        self.status = None     # HardStatus do relatório (New, Active, Approved...)
+        self.distancia = None  # Distance do relatório em metros (negativa = penetração)
+        self.x = self.y = self.z = None
+        # Casas decimais de cada eixo no relatório, para reescrever as coordenadas igual ao
+        # original; _coord_txt guarda os textos originais quando isso não basta (ex.: '1.5e3')
+        self.casas = _SEM_CASAS
+        self._coord_txt = None
+        self.disciplina_1 = self.disciplina_2 = None
+        self.entity_1 = self.entity_2 = None
+        self.layer_1 = self.layer_2 = None
+        self._img_pre = self._img_suf = None
+
+    @classmethod
+    def from_dict(cls, registro):
+        """Converte um registro no formato antigo (dict de strings) para Clash."""
+        if isinstance(registro, Clash):
+            return registro
+        clash = cls(registro.get('name'))
+        clash.id = registro.get('id')
+        clash.definir_imagem(registro.get('image_loc'), clash.id)
+        if 'coord_x' in registro:
+            clash.definir_ponto(registro.get('coord_x'), registro.get('coord_y'), registro.get('coord_z'))
+        for campo in ('disciplina_1', 'disciplina_2', 'entity_1', 'entity_2'):
+            setattr(clash, campo, registro.get(campo))
+        for campo in ('layer_1', 'layer_2'):
+            valor = registro.get(campo)
+            setattr(clash, campo, sys.intern(valor) if isinstance(valor, str) else valor)
+        return clash
+
+    def definir_ponto(self, x, y, z):
+        """Converte as coordenadas (strings do relatório) para float uma única vez."""
+        self._coord_txt = None
+        try:
+            self.x, self.y, self.z = float(x), float(y), float(z)
+        except (TypeError, ValueError):
+            self.x = self.y = self.z = None
+            return
+        textos = (x.strip(), y.strip(), z.strip())
+        casas = tuple(len(texto) - texto.index('.') - 1 if '.' in texto else 0 for texto in textos)
+        self.casas = _CASAS_COMPARTILHADAS.setdefault(casas, casas)
+        # Textos que o float com as casas do eixo não reproduz ficam guardados como estão
+        if any(f"{valor:.{casas_eixo}f}" != texto
+               for valor, casas_eixo, texto in zip((self.x, self.y, self.z), casas, textos)):
+            self._coord_txt = textos
+
+    def definir_distancia(self, distancia):
+        """Converte a distância do relatório ('-0.061m') para float."""
+        try:
+            self.distancia = float(distancia.replace('m', ''))
+        except (AttributeError, ValueError):
+            self.distancia = None
+
+    def definir_imagem(self, image_loc, id_clash):
+        """Guarda o caminho da imagem como prefixo/sufixo compartilhados + ID do clash."""
+        if image_loc is None:
+            self._img_pre = self._img_suf = None
+            return
+        pos = image_loc.find('\\') + 1
+        if pos and id_clash and image_loc.startswith(id_clash, pos):
+            self._img_pre = sys.intern(image_loc[:pos])
+            self._img_suf = sys.intern(image_loc[pos + len(id_clash):])
+        else:
+            self._img_pre, self._img_suf = image_loc, None
+
+    @property
+    def image_loc(self):
+        if self._img_suf is None:
+            return self._img_pre
+        return f"{self._img_pre}{self.id}{self._img_suf}"
+
+    def _coordenada(self, eixo, valor):
+        if valor is None:
+            return None
+        if self._coord_txt is not None:
+            return self._coord_txt[eixo]
+        return f"{valor:.{self.casas[eixo]}f}"
+
+    @property
+    def coord_x(self):
+        return self._coordenada(0, self.x)
+
+    @property
+    def coord_y(self):
+        return self._coordenada(1, self.y)
+
+    @property
+    def coord_z(self):
+        return self._coordenada(2, self.z)
+
+    @property
+    def coordinates(self):
+        if self.x is None:
+            return None
+        return f"{self.coord_x}, {self.coord_y}, {self.coord_z}"
+
+    # --- Visão compatível com dicionário ---
+    def __getitem__(self, chave):
+        if chave in Clash.CHAVES:
+            valor = getattr(self, chave)
+            if valor is not None:
+                return valor
+        raise KeyError(chave)
+
+    def get(self, chave, default=None):
+        if chave in Clash.CHAVES:
+            valor = getattr(self, chave)
+            if valor is not None:
+                return valor
+        return default
+
+    def __contains__(self, chave):
+        return chave in Clash.CHAVES and getattr(self, chave) is not None
+
+    def keys(self):
+        return [chave for chave in Clash.CHAVES if getattr(self, chave) is not None]
+
+    def items(self):
+        return [(chave, getattr(self, chave)) for chave in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __bool__(self):
+        # Como o dicionário antigo: falso enquanto nenhum campo foi preenchido
+        return (self.name is not None or self.id is not None or self._img_pre is not None
+                or self.x is not None or self.y is not None or self.z is not None
+                or self.disciplina_1 is not None or self.disciplina_2 is not None
+                or self.entity_1 is not None or self.entity_2 is not None
+                or self.layer_1 is not None or self.layer_2 is not None)
+
+    def as_dict(self):
+        """Retorna o registro no formato antigo (dict de strings)."""
+        return dict(self.items())
+
+    def __eq__(self, outro):
+        if isinstance(outro, Clash):
+            return all(getattr(self, campo) == getattr(outro, campo) for campo in Clash._CAMPOS)
+        if isinstance(outro, dict):
+            return self.as_dict() == outro
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Clash({self.as_dict()!r})"
+
+# ------------------------------------------------------------
+# Função: como_clash
+# Propósito: Aceita tanto Clash quanto o antigo dict de strings nas etapas do pipeline.
+# ------------------------------------------------------------
+def como_clash(registro):
+    return registro if isinstance(registro, Clash) else Clash.from_dict(registro)
+
+# ------------------------------------------------------------
+# Função: is_clash_complete
+# Propósito: Verificar se um registro de clash possui todas as informações obrigatórias.
+# Retorna True se estiver completo; caso contrário, retorna False.
+# ------------------------------------------------------------
+def is_clash_complete(clash):
+    """
+    Verifica se o dicionário do clash contém todas as informações obrigatórias.
+    Caso algum campo obrigatório esteja faltando ou com valor vazio (e para os layers,
+    se o valor for 'Layer_vazio'), a função retorna False.
+    """
+    if isinstance(clash, Clash):
+        return bool(clash.name and clash.id and clash.x is not None
+                    and clash.disciplina_1 and clash.disciplina_2
+                    and clash.layer_1 and clash.layer_2
+                    and clash.layer_1 != 'Layer_vazio' and clash.layer_2 != 'Layer_vazio')
+    required_fields = [
+        'name', 'id', 'coord_x', 'coord_y', 'coord_z',
+        'disciplina_1', 'disciplina_2',
+        'layer_1', 'layer_2'
+    ]
+    for field in required_fields:
+        if field not in clash or not clash[field]:
+            return False
+        if field in ['layer_1', 'layer_2'] and clash[field] == 'Layer_vazio':
+            return False
+    return True
+
+# Extensões aceitas para os relatórios de clash
+EXTENSOES_RELATORIO = ('.txt', '.xml')
+
+def eh_relatorio_xml(filepath):
+    return os.fspath(filepath).lower().endswith('.xml')
+
+# ------------------------------------------------------------
+# Função: iter_clashes
+# Propósito: Lê o arquivo de clash (.txt) linha a linha e gera um registro de clash
+# finalizado a cada fronteira 'Name:' / '------------------', sem carregar o arquivo
+# inteiro na memória. Relatórios .xml são lidos elemento a elemento (clash_xml).
+# ------------------------------------------------------------
+def iter_clashes(filepath, progresso=None, propriedades=None):
+    """
+    Gera, um a um, os registros de clash do relatório do Navisworks.
+
+    O arquivo é lido de forma incremental, então o consumo de memória não depende
+    do tamanho do relatório. Cada registro é entregue assim que termina (na linha
+    'Name:' do próximo clash, no separador '------------------' ou no fim do
+    arquivo); cabe ao chamador separar completos de problemáticos com
+    is_clash_complete. 'progresso', se informado, é chamado periodicamente como
+    progresso(bytes_lidos, tamanho_do_arquivo). Relatórios exportados em XML (.xml)
+    são lidos por clash_xml.iter_clashes_xml.
+
+    'propriedades', se informado (clash_propriedades.TabelaPropriedades), recebe as
+    propriedades dos itens (CCR_*) de cada clash, que de outra forma são descartadas.
+    """
+    if eh_relatorio_xml(filepath):
+        from clash_xml import iter_clashes_xml
+        yield from iter_clashes_xml(filepath, progresso, propriedades)
+        return
+
+    with open(filepath, 'r', encoding='utf-8') as arquivo:
+        if progresso is None:
+            yield from _iterar_registros(arquivo, propriedades=propriedades)
+        else:
+            tamanho = os.fstat(arquivo.fileno()).st_size
+            yield from _iterar_registros(_linhas_com_progresso(arquivo, tamanho, progresso),
+                                         propriedades=propriedades)
+
+# Intervalo (em linhas) entre os avisos de andamento da leitura
+_LINHAS_POR_AVISO = 8192
+
+def _linhas_com_progresso(arquivo, tamanho, progresso):
+    """Repassa as linhas do arquivo chamando progresso(bytes_lidos, tamanho) a cada bloco de linhas."""
+    for numero, linha in enumerate(arquivo, start=1):
+        yield linha
+        if numero % _LINHAS_POR_AVISO == 0:
+            progresso(arquivo.buffer.tell(), tamanho)
+    progresso(tamanho, tamanho)
+
+def _iterar_registros(linhas, continua=False, propriedades=None):
+    """
+    Núcleo do parser: consome um iterável de linhas e gera os registros de clash.
+
+    'continua' indica que as linhas são um trecho do relatório seguido de outro
+    registro ('Name:'); um item sem layer no fim do trecho recebe 'Layer_vazio', como
+    aconteceria ao ler a linha 'Name:' seguinte no arquivo inteiro. 'propriedades'
+    recebe as linhas 'chave: valor' dos itens aceitas por propriedades.aceita(chave).
+    """
+    current_clash = Clash()
+    # Layer pendente: após 'Item 1'/'Item 2' a linha seguinte define o layer do item
+    item_pendente = None
+    # Item (1 ou 2) cujas linhas estão sendo lidas; 0 fora dos blocos de item
+    item_atual = 0
+
+    for linha_bruta in linhas:
+        if item_pendente is not None:
+            if linha_bruta.startswith('Layer:'):
+                _, valor = linha_bruta.split(':', 1)
+                setattr(current_clash, item_pendente, sys.intern(valor.strip()))
+            else:
+                setattr(current_clash, item_pendente, 'Layer_vazio')
+            item_pendente = None
+
+        linha = linha_bruta.strip()
+
+        if linha.startswith('Name:'):
+            if current_clash:  # Se já houver um clash em progresso, ele está finalizado
+                yield current_clash
+            _, valor = linha.split(':', 1)
+            current_clash = Clash(valor.strip())  # Inicia um novo registro de clash
+            item_atual = 0
+
+        elif linha.startswith('------------------'):
+            if current_clash:
+                yield current_clash
+                current_clash = Clash()
+            item_atual = 0
+
+        elif linha.startswith('Image Location:'):
+            _, valor = linha.split(':', 1)
+            _, pre_id = linha.split('\\', 1)
+            id_val, _ = pre_id.split('.', 1)
+            current_clash.id = id_val.strip()
+            current_clash.definir_imagem(valor.strip(), current_clash.id)
+
+        elif linha.startswith('Distance:'):
+            _, valor = linha.split(':', 1)
+            current_clash.definir_distancia(valor.strip())
+
+        elif linha.startswith('HardStatus:'):
+            _, valor = linha.split(':', 1)
+            current_clash.status = sys.intern(valor.strip())
+
+        elif linha.startswith('Clash Point:'):
+            _, valor = linha.split(':', 1)
+            cord_sem_m = valor.replace('m', '').strip()
+            x, resto = cord_sem_m.split(',', 1)
+            y, z = resto.split(',', 1)
+            current_clash.definir_ponto(x, y, z)
+
+        elif linha.startswith('Path:'):
+            disciplina = extract_disciplina(linha)
+            if disciplina:
+                if current_clash.disciplina_1 is None:
+                    current_clash.disciplina_1 = disciplina
+                else:
+                    current_clash.disciplina_2 = disciplina
+
+        elif linha.startswith('Entity Handle:'):
+            _, valor = linha.split(':', 1)
+            if current_clash.entity_1 is None:
+                current_clash.entity_1 = valor.strip()
+            else:
+                current_clash.entity_2 = valor.strip()
+
+        elif linha.startswith('Item 1'):
+            item_pendente = 'layer_1'
+            item_atual = 1
+
+        elif linha.startswith('Item 2'):
+            item_pendente = 'layer_2'
+            item_atual = 2
+
+        elif propriedades is not None and item_atual:
+            chave, separador, valor = linha.partition(':')
+            if separador and propriedades.aceita(chave):
+                propriedades.adicionar(current_clash, item_atual, chave.strip(), valor.strip())
+
+    if continua and item_pendente is not None:
+        setattr(current_clash, item_pendente, 'Layer_vazio')
+
+    # Entrega o último clash processado após o fim das linhas
+    if current_clash:
+        yield current_clash
+
+# ------------------------------------------------------------
+# Função: process_clash_file
+# Propósito: Processa o arquivo de clash (.txt ou .xml), separando registros completos dos problemáticos.
+# Retorna uma lista de clashs completos, a lista de disciplinas encontradas e os clashs problemáticos.
+# ------------------------------------------------------------
+def process_clash_file(filepath, progresso=None, propriedades=None):
+    return _separar_registros(iter_clashes(filepath, progresso, propriedades))
+
+def _separar_registros(registros):
+    lista_disciplinas = []
+    clashs = []               # Registros completos
+    clashs_problematicos = [] # Registros com informações faltantes
+
+    for clash in registros:
+        for key in ('disciplina_1', 'disciplina_2'):
+            disciplina = clash.get(key)
+            if disciplina and disciplina not in lista_disciplinas:
+                lista_disciplinas.append(disciplina)
+        if is_clash_complete(clash):
+            clashs.append(clash)
+        else:
+            clashs_problematicos.append(clash)
+    return clashs, lista_disciplinas, clashs_problematicos
+
+# Tamanho mínimo do relatório para a leitura em paralelo (abaixo disso, iniciar os
+# processos custa mais do que ler o arquivo em um só núcleo)
+_TAMANHO_MINIMO_PARALELO = 32 << 20
+
+# Trechos por processo: trechos menores equilibram melhor a carga entre os núcleos
+_TRECHOS_POR_WORKER = 4
+
+# ------------------------------------------------------------
+# Função: dividir_relatorio
+# Propósito: Divide o relatório (mapeado em memória) em trechos de bytes que começam
+# sempre em uma linha 'Name:', de modo que cada trecho tenha apenas registros inteiros.
+# Retorna a lista de (inicio, fim).
+# ------------------------------------------------------------
+def dividir_relatorio(filepath, quantidade):
+    tamanho = os.path.getsize(filepath)
+    if tamanho == 0 or quantidade <= 1:
+        return [(0, tamanho)]
+    with open(filepath, 'rb') as arquivo, \
+            mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+        limites = [0]
+        for indice in range(1, quantidade):
+            posicao = mapa.find(b'\nName:', max(tamanho * indice // quantidade, limites[-1]))
+            if posicao < 0:
+                break
+            if posicao + 1 > limites[-1]:
+                limites.append(posicao + 1)
+        limites.append(tamanho)
+    return list(zip(limites, limites[1:]))
+
+def _ler_trecho(filepath, inicio, fim, continua):
+    """Lê os registros de um trecho do relatório (executado nos processos da leitura em paralelo)."""
+    falhas_antes = Counter(falhas_extracao)
+    with open(filepath, 'rb') as arquivo, \
+            mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+        texto = mapa[inicio:fim].decode('utf-8')
+    # newline=None converte as quebras de linha como o open() em modo texto
+    linhas = io.StringIO(texto, newline=None)
+    registros = list(_iterar_registros(linhas, continua=continua))
+    return registros, falhas_extracao - falhas_antes
+
+# ------------------------------------------------------------
+# Função: process_clash_file_paralelo
+# Propósito: Igual a process_clash_file, mas lendo trechos do relatório em vários
+# processos; os registros são juntados na ordem do arquivo. Relatórios pequenos (ou
+# com workers=1) são lidos normalmente, em um só processo.
+# ------------------------------------------------------------
+def process_clash_file_paralelo(filepath, workers=None, progresso=None):
+    workers = workers or os.cpu_count() or 1
+    tamanho = os.path.getsize(filepath)
+    # O XML não tem como ser dividido em trechos: é lido em streaming, em um só processo
+    if workers <= 1 or tamanho < _TAMANHO_MINIMO_PARALELO or eh_relatorio_xml(filepath):
+        return process_clash_file(filepath, progresso)
+
+    trechos = dividir_relatorio(filepath, workers * _TRECHOS_POR_WORKER)
+    workers = min(workers, len(trechos))
+    registros = []
+    lidos = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futuros = [executor.submit(_ler_trecho, filepath, inicio, fim, fim < tamanho)
+                   for inicio, fim in trechos]
+        try:
+            for futuro, (inicio, fim) in zip(futuros, trechos):
+                parcial, falhas = futuro.result()
+                registros.extend(parcial)
+                falhas_extracao.update(falhas)
+                lidos += fim - inicio
+                if progresso is not None:
+                    progresso(lidos, tamanho)
+        except BaseException:
+            for futuro in futuros:
+                futuro.cancel()
+            raise
+    return _separar_registros(registros)
+
+# ------------------------------------------------------------
+# Classe: MatrixRules
+# Propósito: Índice da aba 'Matriz', lido uma única vez, que responde se um par de
+# disciplinas é permitido ('O') com uma consulta em tabela hash.
+# ------------------------------------------------------------
+class MatrixRules:
+    """
+    Regras da matriz de interferências.
+
+    A aba 'Matriz' tem as disciplinas na linha 2 (a partir da coluna 3) e na coluna 2
+    (a partir da linha 3). O par (disciplina_1, disciplina_2) é permitido quando a
+    célula na coluna de disciplina_1 e na linha de disciplina_2 vale 'O'.
+    """
+
+    def __init__(self, permitidos=()):
+        # Conjunto de pares (disciplina da coluna, disciplina da linha) marcados com 'O'
+        self.permitidos = frozenset((d1, d2) for d1, d2 in permitidos)
+
+    @classmethod
+    def from_workbook(cls, matrix_path, aba='Matriz'):
+        """Lê a aba da matriz (modo somente leitura) e monta o índice de pares permitidos."""
+        workbook = openpyxl.load_workbook(matrix_path, read_only=True)
+        try:
+            return cls.from_worksheet(workbook[aba])
+        finally:
+            workbook.close()
+
+    @classmethod
+    def from_worksheet(cls, aba_matriz):
+        linhas = [tuple(row) for row in aba_matriz.iter_rows(values_only=True)]
+
+        # Coluna de cada disciplina na segunda linha (colunas a partir da 3); vale a primeira ocorrência
+        colunas = {}
+        if len(linhas) >= 2:
+            for indice, valor in enumerate(linhas[1][2:], start=2):
+                colunas.setdefault(valor, indice)
+
+        # Linha de cada disciplina na coluna 2 (linhas a partir da 3); vale a primeira ocorrência
+        linhas_disciplina = {}
+        for indice, row in enumerate(linhas[2:], start=2):
+            if len(row) > 1:
+                linhas_disciplina.setdefault(row[1], indice)
+
+        permitidos = []
+        for disciplina_1, coluna in colunas.items():
+            for disciplina_2, indice in linhas_disciplina.items():
+                row = linhas[indice]
+                if coluna < len(row) and row[coluna] == 'O':
+                    permitidos.append((disciplina_1, disciplina_2))
+        return cls(permitidos)
+
+    def permitido(self, disciplina_1, disciplina_2):
+        """Consulta direta: disciplina_1 na coluna e disciplina_2 na linha da matriz."""
+        return (disciplina_1, disciplina_2) in self.permitidos
+
+    def permitido_simetrico(self, disciplina_a, disciplina_b):
+        """Consulta sem ordem: o par é permitido se estiver marcado em qualquer das duas posições."""
+        return ((disciplina_a, disciplina_b) in self.permitidos or
+                (disciplina_b, disciplina_a) in self.permitidos)
+
+# ------------------------------------------------------------
+# Função: process_matrix
+# Propósito: Validar os clashs com base nas disciplinas, usando a matriz (.xlsx).
+# Aceita o caminho da planilha ou um MatrixRules já carregado.
+# Retorna a lista de clashs semi aprovados conforme verificação na matriz.
+# ------------------------------------------------------------
+def process_matrix(clashs, matrix_path):
+    if isinstance(matrix_path, MatrixRules):
+        regras = matrix_path
+    else:
+        regras, _ = carregar_regras(matrix_path)
+
+    # Um clash é semi aprovado quando a célula do par de disciplinas na matriz é "O"
+    clashs_semi_aprovados = []
+    for clash in map(como_clash, clashs):
+        if regras.permitido(clash.disciplina_1, clash.disciplina_2):
+            clashs_semi_aprovados.append(clash)
+    return clashs_semi_aprovados
+
+# ------------------------------------------------------------
+# Função: _compilar_padrao_layer
+# Propósito: Classifica um layer da aba 'exceções' como exato, prefixo ('DPS*')
+# ou padrão glob geral ('sinC_*_BIM', 'H-MODULO ?').
+# ------------------------------------------------------------
+def _compilar_padrao_layer(texto):
+    if '*' not in texto and '?' not in texto:
+        return ('exato', texto)
+    corpo = texto[:-1]
+    if texto.endswith('*') and '*' not in corpo and '?' not in corpo:
+        return ('prefixo', corpo)
+    regex = ''.join('.*' if ch == '*' else '.' if ch == '?' else re.escape(ch) for ch in texto)
+    return ('glob', re.compile(regex, re.DOTALL))
+
+def _layer_casa(padrao, layer):
+    tipo, valor = padrao
+    if tipo == 'exato':
+        return layer == valor
+    if tipo == 'prefixo':
+        return layer.startswith(valor)
+    return valor.fullmatch(layer) is not None
+
+# ------------------------------------------------------------
+# Classe: ExceptionRules
+# Propósito: Índice da aba 'exceções', montado uma única vez. Pares exatos ficam em um
+# conjunto de frozensets (par sem ordem) e os padrões com curinga ('DPS*') ficam em uma
+# árvore de prefixos, de modo que cada consulta fica próxima de O(1).
+# ------------------------------------------------------------
+class ExceptionRules:
+    """
+    Regras de exceção por par de layers (colunas 2 e 4 da aba 'exceções').
+
+    Cada lado da regra pode ser um layer exato ou um padrão com '*'/'?', por exemplo
+    'DPS*' x 'sinC_*'. A ordem dos lados não importa.
+    """
+
+    def __init__(self, regras=()):
+        self.regras = [(layer_a, layer_b) for layer_a, layer_b in regras]
+        self._exatas = set()             # frozenset({layer_a, layer_b}) das regras sem curinga
+        self._por_layer = defaultdict(list)  # layer exato -> padrões do outro lado
+        self._trie = {}                  # árvore de prefixos -> padrões do outro lado (chave None)
+        self._globs = []                 # (padrão glob compilado, padrão do outro lado)
+        self._memo = {}
+
+        for layer_a, layer_b in self.regras:
+            padrao_a = _compilar_padrao_layer(layer_a)
+            padrao_b = _compilar_padrao_layer(layer_b)
+            if padrao_a[0] == 'exato' and padrao_b[0] == 'exato':
+                self._exatas.add(frozenset((layer_a, layer_b)))
+                continue
+            # Indexa pelo lado mais seletivo; a consulta testa as duas ordens
+            if padrao_a[0] != 'exato' and padrao_b[0] != 'glob':
+                padrao_a, padrao_b = padrao_b, padrao_a
+            tipo, valor = padrao_a
+            if tipo == 'exato':
+                self._por_layer[valor].append(padrao_b)
+            elif tipo == 'prefixo':
+                no = self._trie
+                for ch in valor:
+                    no = no.setdefault(ch, {})
+                no.setdefault(None, []).append(padrao_b)
+            else:
+                self._globs.append((valor, padrao_b))
+
+    @classmethod
+    def from_workbook(cls, matrix_path, aba='exceções'):
+        """Lê a aba de exceções (modo somente leitura) e monta o índice."""
+        workbook = openpyxl.load_workbook(matrix_path, read_only=True)
+        try:
+            return cls.from_worksheet(workbook[aba])
+        finally:
+            workbook.close()
+
+    @classmethod
+    def from_worksheet(cls, aba):
+        regras = []
+        for row in aba.iter_rows(min_row=2, values_only=True):
+            valor_1 = row[1] if len(row) > 1 else None
+            valor_2 = row[3] if len(row) > 3 else None
+            layer_ex1 = str(valor_1).strip() if valor_1 is not None else ''
+            layer_ex2 = str(valor_2).strip() if valor_2 is not None else ''
+            regras.append((layer_ex1, layer_ex2))
+        return cls(regras)
+
+    def _candidatos(self, layer):
+        """Padrões do outro lado de todas as regras cujo lado indexado casa com o layer."""
+        yield from self._por_layer.get(layer, ())
+        no = self._trie
+        yield from no.get(None, ())
+        for ch in layer:
+            no = no.get(ch)
+            if no is None:
+                break
+            yield from no.get(None, ())
+        for regex, padrao in self._globs:
+            if regex.fullmatch(layer) is not None:
+                yield padrao
+
+    def eh_excecao(self, layer1, layer2):
+        """Retorna True se o par de layers (sem ordem) estiver na lista de exceções."""
+        chave = frozenset((layer1, layer2))
+        if chave in self._exatas:
+            return True
+        resultado = self._memo.get(chave)
+        if resultado is None:
+            resultado = (any(_layer_casa(p, layer2) for p in self._candidatos(layer1)) or
+                         any(_layer_casa(p, layer1) for p in self._candidatos(layer2)))
+            self._memo[chave] = resultado
+        return resultado
+
+# ------------------------------------------------------------
+# Função: separacao_de_excecao
+# Propósito: Verificar quais clashs aprovados pela matriz estão na lista de exceções
+# definida na aba 'exceções' e separá-los em duas listas (aprovados e exceções).
+# Aceita o caminho da planilha ou um ExceptionRules já carregado.
+# ------------------------------------------------------------
+def separacao_de_excecao(clashs, matriz_path):
+    if isinstance(matriz_path, ExceptionRules):
+        excecoes = matriz_path
+    else:
+        _, excecoes = carregar_regras(matriz_path)
+    clashs_aprovados = []
+    clashs_excecoes = []
+    for clash in map(como_clash, clashs):
+        # Obtém e limpa os layers
+        layer1 = (clash.layer_1 or '').strip()
+        layer2 = (clash.layer_2 or '').strip()
+
+        if excecoes.eh_excecao(layer1, layer2):
+            clashs_excecoes.append(clash)
+        else:
+            clashs_aprovados.append(clash)
+
+    return clashs_aprovados, clashs_excecoes
+
+# Versão do formato do cache de regras; mudar quando MatrixRules/ExceptionRules mudarem
+_VERSAO_CACHE_REGRAS = 1
+
+# ------------------------------------------------------------
+# Função: diretorio_cache_usuario
+# Propósito: Retorna o diretório de cache do usuário (LOCALAPPDATA no Windows,
+# XDG_CACHE_HOME ou ~/.cache nos demais sistemas).
+# ------------------------------------------------------------
+def diretorio_cache_usuario():
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') \
+        or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'clash_analyzer')
+
+# ------------------------------------------------------------
+# Função: preparar_diretorio_cache
+# Propósito: Cria o diretório de cache só para o usuário (0700) e confere se ele pode ser
+# usado: fora do Windows, precisa pertencer ao usuário e não aceitar escrita de outros,
+# já que o cache de relatórios é carregado com pickle.
+# ------------------------------------------------------------
+def preparar_diretorio_cache(cache_dir):
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        info = os.stat(cache_dir)
+    except OSError:
+        return False
+    if hasattr(os, 'getuid'):
+        return info.st_uid == os.getuid() and not info.st_mode & 0o022
+    return True
+
+def _hash_arquivo(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+def _caminho_cache_regras(matrix_path):
+    """Arquivo do cache das regras da planilha, no mesmo diretório do cache de relatórios."""
+    chave = hashlib.sha1(os.path.abspath(matrix_path).encode('utf-8')).hexdigest()
+    return os.path.join(diretorio_cache_relatorios(), f"regras_{chave}.json")
+
+# Máscara de permissões do processo, lida uma vez (os.umask só permite ler alterando)
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+def _gravar_json_atomico(caminho, dados, indent=None):
+    pasta = os.path.dirname(caminho)
+    os.makedirs(pasta, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as arquivo:
+            json.dump(dados, arquivo, ensure_ascii=False, indent=indent)
+        # O mkstemp cria o arquivo como 0600; o arquivo final tem as permissões normais
+        os.chmod(temporario, 0o666 & ~_UMASK)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.remove(temporario)
+        raise
+
+# ------------------------------------------------------------
+# Função: carregar_regras
+# Propósito: Carregar a matriz e as exceções da planilha (.xlsx) usando um cache compilado.
+# Na primeira execução as duas tabelas são lidas da planilha e serializadas em JSON no
+# diretório de cache do usuário (nada é gravado ao lado da planilha); nas seguintes o
+# cache é usado enquanto tamanho, data de modificação ou conteúdo (sha256) da planilha
+# não mudarem.
+# ------------------------------------------------------------
+def carregar_regras(matrix_path):
+    """
+    Retorna (MatrixRules, ExceptionRules) da planilha, reconstruindo o cache
+    automaticamente quando a planilha muda.
+    """
+    info = os.stat(matrix_path)
+    caminho_cache = _caminho_cache_regras(matrix_path)
+    sha256 = None
+
+    try:
+        with open(caminho_cache, 'r', encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+    except (OSError, ValueError):
+        dados = {}
+    if dados.get('versao') == _VERSAO_CACHE_REGRAS:
+        valido = dados.get('tamanho') == info.st_size and dados.get('mtime_ns') == info.st_mtime_ns
+        if not valido and dados.get('tamanho') == info.st_size:
+            # Data mudou (cópia, checkout...): confere o conteúdo antes de descartar o cache
+            sha256 = _hash_arquivo(matrix_path)
+            valido = dados.get('sha256') == sha256
+            if valido:
+                dados['mtime_ns'] = info.st_mtime_ns
+                try:
+                    _gravar_json_atomico(caminho_cache, dados)
+                except OSError:
+                    pass
+        if valido:
+            return (MatrixRules(tuple(par) for par in dados['matriz']),
+                    ExceptionRules(tuple(par) for par in dados['excecoes']))
+
+    # Cache ausente ou desatualizado: lê as duas abas em uma única abertura da planilha
+    workbook = openpyxl.load_workbook(matrix_path, read_only=True)
+    try:
+        regras_matriz = MatrixRules.from_worksheet(workbook['Matriz'])
+        regras_excecao = ExceptionRules.from_worksheet(workbook['exceções'])
+    finally:
+        workbook.close()
+
+    dados = {
+        'versao': _VERSAO_CACHE_REGRAS,
+        'tamanho': info.st_size,
+        'mtime_ns': info.st_mtime_ns,
+        'sha256': sha256 or _hash_arquivo(matrix_path),
+        'matriz': sorted(regras_matriz.permitidos, key=str),
+        'excecoes': regras_excecao.regras,
+    }
+    if preparar_diretorio_cache(os.path.dirname(caminho_cache)):
+        try:
+            _gravar_json_atomico(caminho_cache, dados)
+        except OSError:
+            pass  # Sem cache nesta execução; as regras continuam válidas
+    return regras_matriz, regras_excecao
+
+# ------------------------------------------------------------
+# Classe: SaidasPendentes
+# Propósito: Temporários das saídas de uma execução (planilha, TXTs, DXFs, defeitos),
+# renomeados juntos para os nomes finais só depois que todas foram geradas.
+# ------------------------------------------------------------
+class SaidasPendentes:
+    """
+    Use como gerenciador de contexto:
+
+        with SaidasPendentes(diretorio_saida) as saidas:
+            criar_txts_por_disciplina(clashs, diretorio_saida, saidas=saidas)
+            criar_txt_defeitos(problematicos, diretorio_saida, saidas=saidas)
+
+    Ao sair do bloco sem erro, todas as saídas são publicadas de uma vez; com erro ou
+    cancelamento, os temporários são apagados e os arquivos anteriores ficam intactos.
+    """
+
+    def __init__(self, diretorio_saida):
+        os.makedirs(diretorio_saida, exist_ok=True)
+        self.diretorio_saida = diretorio_saida
+        self._pendentes = []  # (caminho temporário, caminho final)
+
+    def temporario(self, nome):
+        """Caminho temporário da saída 'nome', publicado junto com as demais."""
+        temporario = os.path.join(self.diretorio_saida, f".{nome}.{uuid.uuid4().hex}.tmp")
+        self._pendentes.append((temporario, os.path.join(self.diretorio_saida, nome)))
+        return temporario
+
+    def publicar(self):
+        pendentes, self._pendentes = self._pendentes, []
+        for temporario, final in pendentes:
+            os.replace(temporario, final)
+
+    def descartar(self):
+        pendentes, self._pendentes = self._pendentes, []
+        for temporario, _ in pendentes:
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        if tipo is None:
+            self.publicar()
+        else:
+            self.descartar()
+        return False
+
+# ------------------------------------------------------------
+# Classe: TabelaSimbolos
+# Propósito: Mapa de cada texto distinto (layer ou disciplina) para um inteiro pequeno,
+# atribuído na ordem em que o texto aparece pela primeira vez.
+# ------------------------------------------------------------
+class TabelaSimbolos:
+    __slots__ = ('textos', '_codigos')
+
+    def __init__(self):
+        self.textos = []    # código -> texto
+        self._codigos = {}  # texto -> código
+
+    def codigo(self, texto):
+        """Código do texto (None vale SEM_SIMBOLO); textos novos recebem o próximo código."""
+        if texto is None:
+            return SEM_SIMBOLO
+        codigo = self._codigos.get(texto)
+        if codigo is None:
+            codigo = self._codigos[texto] = len(self.textos)
+            self.textos.append(texto)
+        return codigo
+
+    def procurar(self, texto):
+        """Código de um texto já registrado, ou SEM_SIMBOLO."""
+        return self._codigos.get(texto, SEM_SIMBOLO)
+
+    def __len__(self):
+        return len(self.textos)
+
+# Código dos campos ausentes (layer ou disciplina None)
+SEM_SIMBOLO = -1
+
+# ------------------------------------------------------------
+# Classe: SimbolosExecucao
+# Propósito: Tabelas de símbolos de uma execução (layers e disciplinas). Os clashs são
+# codificados uma vez, logo depois da leitura, e o agrupamento, a relação layer x
+# disciplina e as contagens trabalham só com os códigos; os textos voltam a ser
+# usados apenas na escrita das saídas.
+# ------------------------------------------------------------
+class SimbolosExecucao:
+    __slots__ = ('layers', 'disciplinas')
+
+    def __init__(self):
+        self.layers = TabelaSimbolos()
+        self.disciplinas = TabelaSimbolos()
+
+    def codificar(self, clashs):
+        """Retorna os ClashsCodificados da lista (na mesma ordem)."""
+        return ClashsCodificados(self, clashs)
+
+# ------------------------------------------------------------
+# Classe: ClashsCodificados
+# Propósito: Uma lista de clashs com os códigos de layer e disciplina de cada um em
+# arrays paralelos (SEM_SIMBOLO quando o campo falta).
+# ------------------------------------------------------------
+class ClashsCodificados:
+    __slots__ = ('simbolos', 'clashs', 'layer_1', 'layer_2', 'disciplina_1', 'disciplina_2')
+
+    def __init__(self, simbolos, clashs):
+        self.simbolos = simbolos
+        self.clashs = [como_clash(clash) for clash in clashs]
+        layer = simbolos.layers.codigo
+        disciplina = simbolos.disciplinas.codigo
+        self.layer_1 = array('i', [layer(clash.layer_1) for clash in self.clashs])
+        self.layer_2 = array('i', [layer(clash.layer_2) for clash in self.clashs])
+        self.disciplina_1 = array('i', [disciplina(clash.disciplina_1) for clash in self.clashs])
+        self.disciplina_2 = array('i', [disciplina(clash.disciplina_2) for clash in self.clashs])
+
+    def __len__(self):
+        return len(self.clashs)
+
+    def disciplinas_presentes(self):
+        """Códigos das disciplinas preenchidas, na ordem em que aparecem nos clashs."""
+        textos = self.simbolos.disciplinas.textos
+        vistas = {}
+        for codigo_1, codigo_2 in zip(self.disciplina_1, self.disciplina_2):
+            for codigo in (codigo_1, codigo_2):
+                if codigo != SEM_SIMBOLO and codigo not in vistas and textos[codigo]:
+                    vistas[codigo] = None
+        return list(vistas)
+
+# ------------------------------------------------------------
+# Classe: EstatisticaPar
+# Propósito: Contagem de um par de layers em conflito e os IDs do primeiro e do
+# último clash em que ele aparece.
+# ------------------------------------------------------------
+class EstatisticaPar:
+    __slots__ = ('layer_1', 'layer_2', 'contagem', 'primeiro_id', 'ultimo_id')
+
+    def __init__(self, layer_1, layer_2, id_clash):
+        # layer_1/layer_2 guardam a orientação da primeira ocorrência do par
+        # (códigos da SimbolosExecucao durante o processamento, textos depois de resolvidos)
+        self.layer_1 = layer_1
+        self.layer_2 = layer_2
+        self.contagem = 1
+        self.primeiro_id = id_clash
+        self.ultimo_id = id_clash
+
+    @property
+    def chave(self):
+        """Chave no formato antigo 'layer_1%layer_2'."""
+        return f"{self.layer_1}%{self.layer_2}"
+
+    def __repr__(self):
+        return (f"EstatisticaPar({self.layer_1!r}, {self.layer_2!r}, contagem={self.contagem}, "
+                f"primeiro_id={self.primeiro_id!r}, ultimo_id={self.ultimo_id!r})")
+
+# ------------------------------------------------------------
+# Função: par_canonico
+# Propósito: Chave de um par de layers sem ordem (A x B e B x A são o mesmo par).
+# ------------------------------------------------------------
+def par_canonico(layer_1, layer_2):
+    return (layer_1, layer_2) if layer_1 <= layer_2 else (layer_2, layer_1)
+
+# ------------------------------------------------------------
+# Função: _agregar_codigos
+# Propósito: agregar_conflitos sobre os códigos: {par de códigos sem ordem: EstatisticaPar}.
+# ------------------------------------------------------------
+def _agregar_codigos(codificados):
+    # Layer vazio ('') não entra no agrupamento, como um layer ausente
+    vazio = codificados.simbolos.layers.procurar('')
+    agregado = {}
+    for clash, layer_1, layer_2 in zip(codificados.clashs, codificados.layer_1, codificados.layer_2):
+        if layer_1 < 0 or layer_2 < 0 or layer_1 == vazio or layer_2 == vazio:
+            continue
+        chave = (layer_1, layer_2) if layer_1 <= layer_2 else (layer_2, layer_1)
+        estatistica = agregado.get(chave)
+        if estatistica is None:
+            agregado[chave] = EstatisticaPar(layer_1, layer_2, clash.id)
+        else:
+            estatistica.contagem += 1
+            estatistica.ultimo_id = clash.id
+    return agregado
+
+# ------------------------------------------------------------
+# Função: agregar_conflitos
+# Propósito: Agrupar os clashs por par de layers (sem ordem) em uma única passada,
+# contando as ocorrências e guardando o primeiro e o último ID de cada par.
+# ------------------------------------------------------------
+def agregar_conflitos(clashs):
+    """
+    Retorna um dicionário {par_canonico: EstatisticaPar}, na ordem em que cada par
+    apareceu pela primeira vez. Clashs sem os dois layers são ignorados.
+    """
+    codificados = SimbolosExecucao().codificar(clashs)
+    textos = codificados.simbolos.layers.textos
+    agregado = {}
+    for estatistica in _agregar_codigos(codificados).values():
+        estatistica.layer_1 = textos[estatistica.layer_1]
+        estatistica.layer_2 = textos[estatistica.layer_2]
+        agregado[par_canonico(estatistica.layer_1, estatistica.layer_2)] = estatistica
+    return agregado
+
+# ------------------------------------------------------------
+# Função: contagem_conflitos_totais
+# Propósito: Iterar pelos clashs para determinar combinações únicas de layers
+# e contar seus conflitos (pares invertidos contam para o mesmo par).
+# ------------------------------------------------------------
+def contagem_conflitos_totais(clashs):
+    agregado = agregar_conflitos(clashs)
+    lista_conflitos = [estatistica.chave for estatistica in agregado.values()]
+    contagem_conflitos_total = [estatistica.contagem for estatistica in agregado.values()]
+    return lista_conflitos, contagem_conflitos_total
+
+# ------------------------------------------------------------
+# Função: _layers_por_disciplina_codigos
+# Propósito: separar_layers sobre os códigos: {disciplina: [layers]} na ordem dos clashs.
+# ------------------------------------------------------------
+def _layers_por_disciplina_codigos(codificados):
+    quantidade_layers = len(codificados.simbolos.layers)
+    layers_por_disciplina = {}
+    vistos = set()  # disciplina * quantidade_layers + layer
+    for layer_1, disciplina_1, layer_2, disciplina_2 in zip(
+            codificados.layer_1, codificados.disciplina_1, codificados.layer_2, codificados.disciplina_2):
+        for layer, disciplina in ((layer_1, disciplina_1), (layer_2, disciplina_2)):
+            if layer < 0 or disciplina < 0:
+                continue
+            par = disciplina * quantidade_layers + layer
+            if par not in vistos:
+                vistos.add(par)
+                layers_por_disciplina.setdefault(disciplina, []).append(layer)
+    return layers_por_disciplina
+
+# ------------------------------------------------------------
+# Função: separar_layers
+# Propósito: Agrupar os layers de cada clash de acordo com suas disciplinas.
+# Retorna um dicionário mapeando cada disciplina para a lista de layers associados.
+# ------------------------------------------------------------
+def separar_layers(clashs):
+    codificados = SimbolosExecucao().codificar(clashs)
+    layers = codificados.simbolos.layers.textos
+    disciplinas = codificados.simbolos.disciplinas.textos
+    return {disciplinas[disciplina]: [layers[layer] for layer in codigos]
+            for disciplina, codigos in _layers_por_disciplina_codigos(codificados).items()}
+
+# ------------------------------------------------------------
+# Função: _relacionar_codigos
+# Propósito: relacionar_conflitos_disciplinas sobre os códigos. 'pares' traz
+# (layer_1, layer_2, contagem) de cada par de layers, 'disciplinas' os códigos das
+# disciplinas na ordem do relatório e 'layers_por_disciplina' os layers (códigos) de
+# cada disciplina. Retorna a lista [((disciplina_i, disciplina_j), grupo)], com os
+# conflitos de cada grupo indexados pelo par (layer_1, layer_2).
+# ------------------------------------------------------------
+def _relacionar_codigos(pares, disciplinas, layers_por_disciplina, simbolos, incluir_vazios=False):
+    # Posição de cada disciplina na lista (define a ordem dos pares no resultado)
+    posicao = {}
+    for disciplina in disciplinas:
+        posicao.setdefault(disciplina, len(posicao))
+    disciplinas = list(posicao)
+
+    # Layer -> posições das disciplinas às quais o layer pertence (lista indexada pelo código)
+    layer_para_disciplinas = [[] for _ in range(len(simbolos.layers))]
+    for disciplina, layers in layers_por_disciplina.items():
+        indice = posicao.get(disciplina)
+        if indice is None:
+            continue
+        for layer in layers:
+            if indice not in layer_para_disciplinas[layer]:
+                layer_para_disciplinas[layer].append(indice)
+
+    # Agrupamento: cada par de layers vai para os pares de disciplinas (i <= j) dos seus layers
+    grupos = {}
+    for layer1, layer2, contagem in pares:
+        pares_disciplinas = {(min(i, j), max(i, j))
+                             for i in layer_para_disciplinas[layer1]
+                             for j in layer_para_disciplinas[layer2]}
+        for par in pares_disciplinas:
+            grupo = grupos.get(par)
+            if grupo is None:
+                grupo = grupos[par] = {'conflitos': {}, 'total': 0}
+            grupo['conflitos'][(layer1, layer2)] = contagem
+            grupo['total'] += contagem
+
+    if incluir_vazios:
+        ordem = [(i, j) for i in range(len(disciplinas)) for j in range(i, len(disciplinas))]
+    else:
+        ordem = sorted(grupos)
+    return [((disciplinas[i], disciplinas[j]), grupos.get((i, j)) or {'conflitos': {}, 'total': 0})
+            for i, j in ordem]
+
+# ------------------------------------------------------------
+# Função: relacionar_conflitos_disciplinas
+# Propósito: Relacionar os conflitos (camadas) entre pares de disciplinas,
+# retornando um dicionário com a contagem total e os detalhes de cada par.
+# Cada par de layers é atribuído ao(s) seu(s) par(es) de disciplinas uma única vez,
+# através de um mapa layer -> disciplinas (agrupamento em uma passada).
+# ------------------------------------------------------------
+def relacionar_conflitos_disciplinas(lista_conflitos, contagem_conflitos_total, lista_disciplinas,
+                                     dicionario_layer_disciplina, incluir_vazios=False):
+    """
+    Relaciona os conflitos entre os layers de cada par de disciplinas, agrupando
+    as contagens e os detalhes dos conflitos.
+
+    Parâmetros:
+      lista_conflitos (list | dict): Lista contendo strings que representam os pares de layers em
+                              conflito, onde os layers são separados por '%', ou diretamente o
+                              agregado retornado por agregar_conflitos.
+      contagem_conflitos_total (list | None): Lista com a contagem (número de ocorrências) para cada
+                                       combinação de layers em 'lista_conflitos' (None quando
+                                       'lista_conflitos' é um agregado).
+      lista_disciplinas (list): Lista de disciplinas encontradas durante o processamento.
+      dicionario_layer_disciplina (dict): Dicionário que mapeia cada disciplina para a lista de layers
+                                          associados a ela.
+      incluir_vazios (bool): Se True, inclui também os pares de disciplinas sem nenhum conflito.
+
+    Retorna:
+      dict: Um dicionário que relaciona cada par de disciplinas (no formato "Disciplina1 x Disciplina2")
+            com os detalhes dos conflitos (camadas conflitantes e suas contagens) e o total de conflitos.
+            Os pares seguem a ordem de 'lista_disciplinas', incluindo combinações iguais
+            (ex: Drenagem x Drenagem).
+    """
+    if isinstance(lista_conflitos, dict):
+        pares_layers = [(estatistica.layer_1, estatistica.layer_2, estatistica.contagem)
+                        for estatistica in lista_conflitos.values()]
+    else:
+        pares_layers = [(*chave.split('%'), contagem)
+                        for chave, contagem in zip(lista_conflitos, contagem_conflitos_total)]
+
+    # Os textos são convertidos em códigos, relacionados e resolvidos de volta no resultado
+    simbolos = SimbolosExecucao()
+    layer = simbolos.layers.codigo
+    disciplina = simbolos.disciplinas.codigo
+    disciplinas = [disciplina(nome) for nome in lista_disciplinas]
+    layers_por_disciplina = {disciplina(nome): [layer(texto) for texto in layers]
+                             for nome, layers in dicionario_layer_disciplina.items()}
+    pares = [(layer(layer1), layer(layer2), contagem) for layer1, layer2, contagem in pares_layers]
+
+    layers = simbolos.layers.textos
+    disciplinas_texto = simbolos.disciplinas.textos
+    conflitos_por_disciplina = {}
+    for (i, j), grupo in _relacionar_codigos(pares, disciplinas, layers_por_disciplina, simbolos,
+                                             incluir_vazios):
+        conflitos = {f"{layers[layer1]}%{layers[layer2]}": contagem
+                     for (layer1, layer2), contagem in grupo['conflitos'].items()}
+        conflitos_por_disciplina[f"{disciplinas_texto[i]} x {disciplinas_texto[j]}"] = {
+            'conflitos': conflitos, 'total': grupo['total']}
+    return conflitos_por_disciplina
+
+# ------------------------------------------------------------
+# Função: count_total_clashes
+# Propósito: Retornar a quantidade total de clashs processados.
+# ------------------------------------------------------------
+def count_total_clashes(clashs):
+    return len(clashs)
+
+# ------------------------------------------------------------
+# Função: chave_objetos
+# Propósito: Chave de um clash pelo par (sem ordem) de objetos envolvidos, cada um
+# identificado pelo layer e pelo entity handle. Retorna None se faltar algum handle.
+# ------------------------------------------------------------
+def chave_objetos(clash):
+    if not clash.entity_1 or not clash.entity_2:
+        return None
+    objeto_1 = (clash.layer_1 or '', clash.entity_1)
+    objeto_2 = (clash.layer_2 or '', clash.entity_2)
+    return (objeto_1, objeto_2) if objeto_1 <= objeto_2 else (objeto_2, objeto_1)
+
+# ------------------------------------------------------------
+# Função: deduplicar_clashs
+# Propósito: Remover clashs repetidos do mesmo par de objetos (o mesmo par aparece em
+# vários testes de clash, ou em vários pontos a poucos centímetros). Usa hash pelo par
+# de entity handles e, com 'distancia', uma grade de células desse tamanho para achar
+# os pontos próximos sem comparar todos os pares.
+# ------------------------------------------------------------
+def deduplicar_clashs(clashs, distancia=None):
+    """
+    Retorna (unicos, duplicados), mantendo a primeira ocorrência de cada grupo.
+
+    Sem 'distancia', todos os clashs do mesmo par de objetos são o mesmo clash. Com
+    'distancia' (em metros), só são unidos os clashs do mesmo par cujos pontos estão a
+    até essa distância de um clash já mantido; ela precisa ser um número finito maior
+    que zero (ValueError). Clashs sem os dois entity handles nunca são considerados
+    duplicados.
+    """
+    if distancia is not None and not (math.isfinite(distancia) and distancia > 0):
+        raise ValueError(f"Distância de deduplicação inválida: {distancia} (use um valor maior que zero)")
+    unicos = []
+    duplicados = []
+    vistos = set()       # pares de objetos já mantidos (sem distância)
+    grade = {}           # (par, célula) -> pontos mantidos (com distância)
+    vizinhanca = [(di, dj, dk) for di in (-1, 0, 1) for dj in (-1, 0, 1) for dk in (-1, 0, 1)]
+    tamanho = distancia or 1.0   # lado das células da grade (sem distância, não é usado)
+
+    for clash in map(como_clash, clashs):
+        chave = chave_objetos(clash)
+        if chave is None:
+            unicos.append(clash)
+            continue
+
+        if distancia is None:
+            if chave in vistos:
+                duplicados.append(clash)
+            else:
+                vistos.add(chave)
+                unicos.append(clash)
+            continue
+        if clash.x is None:
+            # Sem ponto não há como medir a distância
+            unicos.append(clash)
+            continue
+
+        i, j, k = (math.floor(clash.x / tamanho), math.floor(clash.y / tamanho),
+                   math.floor(clash.z / tamanho))
+        proximo = any(
+            (x - clash.x) ** 2 + (y - clash.y) ** 2 + (z - clash.z) ** 2 <= distancia ** 2
+            for di, dj, dk in vizinhanca
+            for x, y, z in grade.get((chave, i + di, j + dj, k + dk), ())
+        )
+        if proximo:
+            duplicados.append(clash)
+        else:
+            grade.setdefault((chave, i, j, k), []).append((clash.x, clash.y, clash.z))
+            unicos.append(clash)
+    return unicos, duplicados
+
+# Versão do parser; mudar sempre que process_clash_file ou Clash mudarem, para
+# invalidar os relatórios já guardados no cache
+_VERSAO_PARSER = 4
+
+# Cabeçalho dos arquivos do cache de relatórios, conferido antes do pickle ser carregado
+_CABECALHO_CACHE = f"clash_analyzer relatorio v{_VERSAO_PARSER}\n".encode('ascii')
+
+# Quantidade de relatórios mantidos no cache (os menos usados são removidos)
+_MAX_RELATORIOS_CACHE = 256
+
+# ------------------------------------------------------------
+# Função: diretorio_cache_relatorios
+# Propósito: Diretório padrão do cache de relatórios já processados.
+# ------------------------------------------------------------
+def diretorio_cache_relatorios():
+    return os.path.join(diretorio_cache_usuario(), 'relatorios')
+
+def _limpar_cache_relatorios(cache_dir):
+    arquivos = [os.path.join(cache_dir, nome) for nome in os.listdir(cache_dir) if nome.endswith('.pickle')]
+    if len(arquivos) <= _MAX_RELATORIOS_CACHE:
+        return
+    arquivos.sort(key=lambda caminho: os.stat(caminho).st_mtime)
+    for caminho in arquivos[:len(arquivos) - _MAX_RELATORIOS_CACHE]:
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+# ------------------------------------------------------------
+# Função: ler_relatorio
+# Propósito: Igual a process_clash_file, mas com cache em disco indexado pelo hash do
+# conteúdo do relatório (e pela versão do parser): relatórios que não mudaram desde a
+# última execução são carregados do cache em vez de processados de novo.
+# ------------------------------------------------------------
+def ler_relatorio(filepath, cache_dir=None, progresso=None, workers=1):
+    """
+    Retorna (clashs, lista_disciplinas, clashs_problematicos) do relatório.
+    Sem 'cache_dir', apenas lê o relatório. As falhas de extração do relatório
+    ficam guardadas no cache e voltam a falhas_extracao quando ele é usado. Com
+    'workers' diferente de 1, relatórios grandes são lidos em paralelo (veja
+    process_clash_file_paralelo; None usa todos os núcleos). O cache só é usado em um
+    diretório do próprio usuário (veja preparar_diretorio_cache).
+    """
+    def ler():
+        if workers == 1:
+            return process_clash_file(filepath, progresso)
+        return process_clash_file_paralelo(filepath, workers, progresso)
+
+    if cache_dir is None or not preparar_diretorio_cache(cache_dir):
+        return ler()
+
+    arquivo_cache = os.path.join(cache_dir, f"{_hash_arquivo(filepath)}-v{_VERSAO_PARSER}.pickle")
+    try:
+        with open(arquivo_cache, 'rb') as arquivo:
+            # Arquivo de outro formato ou versão: nem chega ao pickle
+            if arquivo.read(len(_CABECALHO_CACHE)) != _CABECALHO_CACHE:
+                raise ValueError(f"Cabeçalho inválido no cache: {arquivo_cache}")
+            resultado, falhas = pickle.load(arquivo)
+        os.utime(arquivo_cache)  # Marca como usado recentemente
+        falhas_extracao.update(falhas)
+        return resultado
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        # Cache ausente, corrompido ou de outra versão: processa o relatório normalmente
+        pass
+
+    falhas_antes = Counter(falhas_extracao)
+    resultado = ler()
+    falhas = falhas_extracao - falhas_antes
+    try:
+        fd, temporario = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as arquivo:
+                arquivo.write(_CABECALHO_CACHE)
+                pickle.dump((resultado, falhas), arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, arquivo_cache)
+        except BaseException:
+            os.remove(temporario)
+            raise
+        _limpar_cache_relatorios(cache_dir)
+    except OSError:
+        pass  # Sem cache nesta execução; o resultado continua válido
+    return resultado
+
+# ------------------------------------------------------------
+# Função: pico_memoria_mib
+# Propósito: Pico de memória (RSS) do processo desde o seu início, em MiB, ou None se
+# a plataforma não informar. O valor é acumulado: nunca diminui entre as etapas.
+# ------------------------------------------------------------
+def pico_memoria_mib():
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss é em KiB no Linux e em bytes no macOS
+        return pico / (1 << 20) if sys.platform == 'darwin' else pico / 1024
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class _ContadoresMemoria(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + \
+                       [(nome, ctypes.c_size_t) for nome in (
+                           'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                           'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage',
+                           'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+        contadores = _ContadoresMemoria()
+        contadores.cb = ctypes.sizeof(contadores)
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        obter = kernel32.K32GetProcessMemoryInfo
+        obter.argtypes = (wintypes.HANDLE, ctypes.POINTER(_ContadoresMemoria), wintypes.DWORD)
+        if obter(kernel32.GetCurrentProcess(), ctypes.byref(contadores), contadores.cb):
+            return contadores.PeakWorkingSetSize / (1 << 20)
+    return None
+
+# ------------------------------------------------------------
+# Classe: Instrumentacao
+# Propósito: Medições de uma execução: tempo de cada etapa, registros de entrada e
+# saída, pico de memória do processo e falhas de extração. Gera o relatório da
+# execução em JSON.
+# ------------------------------------------------------------
+class Instrumentacao:
+    """
+    Uso:
+
+        instrumentacao = Instrumentacao()
+        with instrumentacao.etapa('matriz', entrada=len(clashs)) as etapa:
+            semi_aprovados = process_matrix(clashs, regras)
+            etapa['saida'] = len(semi_aprovados)
+        instrumentacao.gravar(os.path.join(out_dir, ARQUIVO_RELATORIO_EXECUCAO))
+
+    'pico_processo_mib' de cada etapa é o pico acumulado do processo ao fim da
+    etapa, não o consumo da etapa: só cresce quando a etapa supera os picos
+    anteriores. Para a memória de cada etapa use benchmarks/executar.py (tracemalloc).
+    """
+
+    def __init__(self):
+        self.etapas = []
+        self.falhas_extracao = Counter()
+        self._inicio = time.perf_counter()
+        self._falhas_inicio = Counter(falhas_extracao)
+
+    @contextmanager
+    def etapa(self, nome, entrada=None, **extras):
+        registro = {'etapa': nome, 'entrada': entrada, 'saida': None, **extras}
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro['segundos'] = round(time.perf_counter() - inicio, 6)
+            registro['pico_processo_mib'] = pico_memoria_mib()
+            self.etapas.append(registro)
+
+    def relatorio(self, **dados):
+        """Dicionário do relatório da execução; 'dados' são acrescentados no topo."""
+        # Falhas deste processo desde o início da execução, mais as vindas de outros processos
+        falhas = (falhas_extracao - self._falhas_inicio) + self.falhas_extracao
+        return {
+            **dados,
+            'segundos': round(time.perf_counter() - self._inicio, 6),
+            'pico_processo_mib': pico_memoria_mib(),
+            'falhas_extracao': {motivo: falhas[motivo] for motivo in ('formato', 'sigla_desconhecida')},
+            'etapas': self.etapas,
+        }
+
+    def gravar(self, caminho, **dados):
+        _gravar_json_atomico(caminho, self.relatorio(**dados), indent=2)
+
+# Nome do relatório da execução, gravado junto das saídas
+ARQUIVO_RELATORIO_EXECUCAO = 'relatorio_execucao.json'
+
+# ------------------------------------------------------------
+# Classe: ProcessamentoCancelado
+# Propósito: Exceção levantada quando o usuário cancela o processamento. As saídas
+# parciais são descartadas (os arquivos anteriores ficam intactos).
+# ------------------------------------------------------------
+class ProcessamentoCancelado(Exception):
+    pass
+
+# ------------------------------------------------------------
+# Classe: _Andamento
+# Propósito: Callback 'avisar' das etapas: repassa o andamento para 'progress' e
+# interrompe a execução (ProcessamentoCancelado) quando 'cancelar' é sinalizado.
+# 'informar' só repassa o andamento: é usado depois que as saídas começam a ser
+# publicadas, quando a execução não pode mais ser interrompida.
+# ------------------------------------------------------------
+class _Andamento:
+    def __init__(self, progress=None, cancelar=None):
+        self.progress = progress
+        self.cancelar = cancelar  # threading.Event (ou qualquer objeto com is_set())
+
+    def verificar(self):
+        if self.cancelar is not None and self.cancelar.is_set():
+            raise ProcessamentoCancelado("Processamento cancelado pelo usuário.")
+
+    def informar(self, percentual, mensagem):
+        if self.progress is not None:
+            self.progress(percentual, mensagem)
+
+    def __call__(self, percentual, mensagem):
+        self.verificar()
+        self.informar(percentual, mensagem)
+
+# ------------------------------------------------------------
+# Função: _faixa_progresso
+# Propósito: Converte o andamento (feito, total) de uma etapa em um percentual dentro
+# da faixa [inicio, fim] da barra de progresso, avisando só quando o valor muda. Com
+# total None (tamanho desconhecido) a barra fica no início e a mensagem traz a contagem.
+# ------------------------------------------------------------
+def _faixa_progresso(avisar, inicio, fim, mensagem):
+    ultimo = None
+    verificar = getattr(avisar, 'verificar', None)
+    def andamento(feito, total):
+        nonlocal ultimo
+        if verificar is not None:
+            verificar()  # O cancelamento é verificado a cada aviso, mesmo sem mudar o percentual
+        if total is None:
+            avisar(inicio, f"{mensagem} {feito} clashs")
+            return
+        percentual = inicio + (fim - inicio) * min(feito, total) // total if total else fim
+        if percentual != ultimo:
+            ultimo = percentual
+            avisar(percentual, mensagem)
+    return andamento
+
+# ------------------------------------------------------------
+# Função: run_pipeline
+# Propósito: Executar todas as etapas do processamento (clash + matriz -> TXTs, defeitos
+# e planilha), informando o andamento por uma função de callback opcional.
+# ------------------------------------------------------------
+def run_pipeline(clash_path, matrix_path, out_dir, progress=None, cache_dir=None,
+                 dedup=False, dedup_distancia=None, cancelar=None, workers=1, dxf=False,
+                 banco=None):
+    """
+    Processa o relatório de clash 'clash_path' com a matriz 'matrix_path' e grava os
+    resultados em 'out_dir', junto com o relatório da execução (tempo, registros e
+    memória de cada etapa) em ARQUIVO_RELATORIO_EXECUCAO.
+
+    'progress', se informado, é chamado como progress(percentual, mensagem) conforme a
+    leitura do relatório (em bytes) e as etapas seguintes (em registros) avançam.
+    'cache_dir', se informado, ativa o cache de relatórios já processados (veja
+    ler_relatorio). Com 'dedup', clashs repetidos do mesmo par de objetos são removidos
+    antes das saídas (veja deduplicar_clashs). 'cancelar' (threading.Event) interrompe
+    a execução entre registros com ProcessamentoCancelado. 'workers' é repassado a
+    ler_relatorio (leitura em paralelo de relatórios grandes). Com 'dxf', também grava um
+    desenho DXF por disciplina com os marcadores dos clashs (veja clash_dxf). Com 'banco'
+    (caminho do arquivo SQLite), os clashs lidos e classificados nesta execução são
+    gravados no histórico (veja clash_banco). Retorna um dicionário com as contagens da
+    execução (e 'execucao', o número da execução no banco).
+    """
+    avisar = _Andamento(progress, cancelar)
+    instrumentacao = Instrumentacao()
+    avisar(0, "Processando arquivo de clash...")
+
+    # **************************************************
+    # Etapa 1: Processamento do arquivo de Clash
+    # **************************************************
+    with instrumentacao.etapa('leitura', bytes=os.path.getsize(clash_path)) as etapa:
+        clashs, _, clashs_problematicos = ler_relatorio(
+            clash_path, cache_dir, _faixa_progresso(avisar, 0, 50, "Processando arquivo de clash..."),
+            workers=workers)
+        etapa['saida'] = len(clashs) + len(clashs_problematicos)
+    avisar(50, "Processando matriz...")
+
+    duplicados = []
+    if dedup or dedup_distancia is not None:
+        with instrumentacao.etapa('deduplicacao', entrada=len(clashs)) as etapa:
+            clashs, duplicados = deduplicar_clashs(clashs, dedup_distancia)
+            etapa['saida'] = len(clashs)
+
+    resumo = processar_clashs(clashs, clashs_problematicos, matrix_path, out_dir, avisar,
+                              instrumentacao, dxf=dxf, banco=banco,
+                              teste=os.path.splitext(os.path.basename(clash_path))[0])
+    resumo['duplicados'] = len(duplicados)
+    instrumentacao.gravar(os.path.join(out_dir, ARQUIVO_RELATORIO_EXECUCAO),
+                          relatorios=[os.path.abspath(clash_path)], resumo=resumo)
+    return resumo
+
+def _nome_matriz(matrix_path):
+    """Caminho absoluto da planilha da matriz, ou None se as regras já vieram carregadas."""
+    return None if isinstance(matrix_path, tuple) else os.path.abspath(matrix_path)
+
+# ------------------------------------------------------------
+# Função: processar_clashs
+# Propósito: Etapas posteriores à leitura do relatório: validação na matriz, exceções,
+# planilha de conflitos, TXTs por disciplina e defeitos. 'matrix_path' pode ser o
+# caminho da planilha ou a tupla (MatrixRules, ExceptionRules) já carregada.
+# ------------------------------------------------------------
+def processar_clashs(clashs, clashs_problematicos, matrix_path, out_dir, avisar,
+                     instrumentacao=None, dxf=False, banco=None, teste=None):
+    instrumentacao = instrumentacao or Instrumentacao()
+
+    # **************************************************
+    # Etapa 2: Validação dos clashs na matriz e separação das exceções
+    # **************************************************
+    with instrumentacao.etapa('regras'):
+        if isinstance(matrix_path, tuple):
+            regras_matriz, regras_excecao = matrix_path
+        else:
+            regras_matriz, regras_excecao = carregar_regras(matrix_path)
+    with instrumentacao.etapa('matriz', entrada=len(clashs)) as etapa:
+        clash_semi_aprovados = process_matrix(clashs, regras_matriz)
+        etapa['saida'] = len(clash_semi_aprovados)
+    with instrumentacao.etapa('excecoes', entrada=len(clash_semi_aprovados)) as etapa:
+        clashs_aprovados, clashs_excecoes = separacao_de_excecao(clash_semi_aprovados, regras_excecao)
+        etapa['saida'] = len(clashs_aprovados)
+        etapa['excecoes'] = len(clashs_excecoes)
+    avisar(55, "Relacionando conflitos por disciplina...")
+
+    return gerar_saidas(clashs, clashs_problematicos, clash_semi_aprovados,
+                        clashs_aprovados, clashs_excecoes, out_dir, avisar, instrumentacao, dxf=dxf,
+                        banco=banco, teste=teste, nome_matriz=_nome_matriz(matrix_path))
+
+# ------------------------------------------------------------
+# Função: gerar_saidas
+# Propósito: A partir dos clashs já classificados, gera a planilha de conflitos por
+# disciplina, os TXTs por disciplina (e, com 'dxf', os desenhos DXF por disciplina) e
+# o arquivo de defeitos. 'teste' é o nome do relatório ou, no modo lote, uma função
+# clash -> nome do relatório, que também separa os IDs repetidos entre relatórios nos
+# arquivos por disciplina. Com 'banco', grava a execução no histórico SQLite. As saídas
+# só são publicadas juntas no final (veja SaidasPendentes); o cancelamento é verificado
+# até esse ponto.
+# ------------------------------------------------------------
+def gerar_saidas(clashs, clashs_problematicos, clash_semi_aprovados, clashs_aprovados,
+                 clashs_excecoes, out_dir, avisar, instrumentacao=None, dxf=False,
+                 banco=None, teste=None, nome_matriz=None, relatorios=1):
+    from clash_excel import calcular_status_por_par, gravar_planilha_conflitos, grupos_planilha_codigos
+    from clash_txt import criar_txt_defeitos, criar_txts_por_disciplina
+
+    instrumentacao = instrumentacao or Instrumentacao()
+    os.makedirs(out_dir, exist_ok=True)
+    relatorio = teste if callable(teste) else None  # Vários relatórios: IDs por relatório
+
+    with instrumentacao.etapa('relacionamento', entrada=len(clash_semi_aprovados)) as etapa:
+        # Layers e disciplinas viram códigos inteiros da execução; os textos só voltam
+        # na escrita da planilha
+        simbolos = SimbolosExecucao()
+        codificados = simbolos.codificar(clashs)
+        semi_aprovados_codificados = simbolos.codificar(clash_semi_aprovados)
+        etapa['layers'] = len(simbolos.layers)
+        etapa['disciplinas'] = len(simbolos.disciplinas)
+
+        # **************************************************
+        # Etapa 3: Separação dos layers por disciplina
+        # **************************************************
+        layers_por_disciplina = _layers_por_disciplina_codigos(codificados)
+
+        # **************************************************
+        # Etapa 4: Contagem e relacionamento dos conflitos entre layers
+        # **************************************************
+        agregado_conflitos = _agregar_codigos(semi_aprovados_codificados)
+
+        # Agora, relaciona os conflitos considerando apenas os clashs semi-aprovados
+        # (e as disciplinas que aparecem neles)
+        conflitos_por_disciplina = _relacionar_codigos(
+            [(estatistica.layer_1, estatistica.layer_2, estatistica.contagem)
+             for estatistica in agregado_conflitos.values()],
+            semi_aprovados_codificados.disciplinas_presentes(), layers_por_disciplina, simbolos,
+            incluir_vazios=True  # O relatório lista todos os pares de disciplinas
+        )
+        etapa['saida'] = len(conflitos_por_disciplina)
+    avisar(60, "Gerando planilha de conflitos...")
+
+    # As saídas ficam em temporários até todas estarem prontas: um cancelamento ou erro
+    # antes disso não deixa saídas novas misturadas às da execução anterior
+    with SaidasPendentes(out_dir) as saidas:
+        # **************************************************
+        # Etapa 5: Planilha com os conflitos entre disciplinas dos clashs semi-aprovados
+        # **************************************************
+        with instrumentacao.etapa('planilha', entrada=len(conflitos_por_disciplina)) as etapa:
+            status_por_par = calcular_status_por_par(_agregar_codigos(simbolos.codificar(clashs_aprovados)),
+                                             _agregar_codigos(simbolos.codificar(clashs_excecoes)))
+            gravar_planilha_conflitos(
+                grupos_planilha_codigos(conflitos_por_disciplina, layers_por_disciplina, status_por_par, simbolos),
+                len(conflitos_por_disciplina), out_dir,
+                progresso=_faixa_progresso(avisar, 60, 85, "Gerando planilha de conflitos..."),
+                saidas=saidas)
+            etapa['saida'] = sum(len(grupo['conflitos']) for _, grupo in conflitos_por_disciplina)
+        avisar(85, "Gerando arquivos por disciplina...")
+
+        # **************************************************
+        # Etapa 6: Geração dos arquivos TXT por disciplina e dos defeitos
+        # **************************************************
+        # Com os DXFs, a faixa dos arquivos por disciplina é dividida entre TXTs e desenhos
+        fim_txts = 91 if dxf else 97
+        with instrumentacao.etapa('txts_disciplinas', entrada=len(clashs_aprovados)) as etapa:
+            etapa['saida'] = criar_txts_por_disciplina(
+                clashs_aprovados, out_dir,
+                progresso=_faixa_progresso(avisar, 85, fim_txts, "Gerando arquivos por disciplina..."),
+                relatorio=relatorio, saidas=saidas)
+        if dxf:
+            from clash_dxf import criar_dxfs_por_disciplina
+
+            avisar(fim_txts, "Gerando desenhos DXF por disciplina...")
+            with instrumentacao.etapa('dxf_disciplinas', entrada=len(clashs_aprovados)) as etapa:
+                etapa['saida'] = criar_dxfs_por_disciplina(
+                    clashs_aprovados, out_dir,
+                    progresso=_faixa_progresso(avisar, fim_txts, 97, "Gerando desenhos DXF por disciplina..."),
+                    relatorio=relatorio, saidas=saidas)
+        avisar(97, "Gerando arquivo de defeitos...")
+        with instrumentacao.etapa('defeitos', entrada=len(clashs_problematicos)) as etapa:
+            criar_txt_defeitos(clashs_problematicos, out_dir, saidas=saidas)
+            etapa['saida'] = len(clashs_problematicos)
+
+        resumo = {
+            'clashs': len(clashs),
+            'problematicos': len(clashs_problematicos),
+            'totais': count_total_clashes(clash_semi_aprovados),
+            'aprovados': len(clashs_aprovados),
+            'excecoes': len(clashs_excecoes),
+        }
+
+        # Última verificação do cancelamento: daqui em diante a execução é concluída
+        # (histórico no banco e publicação das saídas)
+        avisar(98, "Gravando as saídas...")
+        informar = getattr(avisar, 'informar', avisar)
+        if banco is not None:
+            # O histórico recebe exatamente os clashs desta execução (já deduplicados);
+            # se a gravação falhar, as saídas não são publicadas
+            from clash_banco import gravar_linhas
+            from clash_colunar import linhas_classificadas
+
+            informar(98, "Gravando o histórico no banco...")
+            with instrumentacao.etapa('banco', entrada=len(clashs) + len(clashs_problematicos)) as etapa:
+                linhas = linhas_classificadas(clashs, clashs_problematicos, clash_semi_aprovados,
+                                              clashs_excecoes, teste)
+                resumo['execucao'] = gravar_linhas(banco, linhas, nome_matriz, relatorios)
+                etapa['saida'] = resumo['execucao']
+    informar(100, "Concluído!")
+    return resumo
+
+# ------------------------------------------------------------
+# Função: expandir_relatorios
+# Propósito: Converte as entradas do modo lote (diretórios, padrões glob ou arquivos)
+# na lista ordenada de relatórios (.txt ou .xml), sem repetições.
+# ------------------------------------------------------------
+def expandir_relatorios(entradas):
+    if isinstance(entradas, (str, os.PathLike)):
+        entradas = [entradas]
+    relatorios = []
+    for entrada in entradas:
+        entrada = os.fspath(entrada)
+        if os.path.isdir(entrada):
+            encontrados = [caminho for extensao in EXTENSOES_RELATORIO
+                           for caminho in glob.glob(os.path.join(glob.escape(entrada), '*' + extensao))]
+        elif os.path.isfile(entrada):
+            encontrados = [entrada]
+        else:
+            encontrados = glob.glob(entrada)
+        for caminho in sorted(encontrados):
+            if os.path.isfile(caminho) and caminho not in relatorios:
+                relatorios.append(caminho)
+    return relatorios
+
+# Regras da matriz e cache compartilhados pelos processos do modo lote (definidos no initializer)
+_regras_lote = None
+_cache_lote = None
+
+def _iniciar_worker_lote(regras, cache_dir=None):
+    global _regras_lote, _cache_lote
+    _regras_lote = regras
+    _cache_lote = cache_dir
+
+def _processar_relatorio_lote(caminho):
+    """
+    Lê um relatório e classifica seus clashs com as regras compartilhadas. Retorna as
+    cinco listas do pipeline e as falhas de extração do relatório, que no processo
+    do worker não chegam ao falhas_extracao do processo principal.
+    """
+    falhas_antes = Counter(falhas_extracao)
+    clashs, _, clashs_problematicos = ler_relatorio(caminho, _cache_lote)
+    regras_matriz, regras_excecao = _regras_lote
+    clash_semi_aprovados = process_matrix(clashs, regras_matriz)
+    clashs_aprovados, clashs_excecoes = separacao_de_excecao(clash_semi_aprovados, regras_excecao)
+    listas = (clashs, clashs_problematicos, clash_semi_aprovados, clashs_aprovados, clashs_excecoes)
+    return listas, falhas_extracao - falhas_antes
+
+# ------------------------------------------------------------
+# Função: run_batch
+# Propósito: Modo lote: processa em paralelo (um processo por núcleo) todos os relatórios
+# de uma pasta ou padrão glob, com uma única matriz carregada, e junta os resultados em
+# um só conjunto de TXTs por disciplina, um 'defeitos.txt' e uma planilha.
+# ------------------------------------------------------------
+def run_batch(entradas, matrix_path, out_dir, workers=None, progress=None, cache_dir=None,
+              dedup=False, dedup_distancia=None, cancelar=None, dxf=False, banco=None):
+    """
+    Processa vários relatórios de clash de uma vez.
+
+    'entradas' é um diretório, um padrão glob ou uma lista deles. Os relatórios são lidos
+    em paralelo por até 'workers' processos (padrão: número de núcleos) e os resultados são
+    combinados na ordem dos arquivos. Com 'cache_dir', só os relatórios que mudaram desde a
+    última execução são processados de novo (veja ler_relatorio). Com 'dedup', os clashs
+    do mesmo par de objetos repetidos entre os testes são removidos. Como em run_pipeline,
+    o relatório da execução é gravado em 'out_dir'. Retorna o dicionário de contagens de
+    run_pipeline, acrescido de 'relatorios'. 'dxf' e 'banco' funcionam como em
+    run_pipeline; no banco, o teste de cada clash é o nome do seu relatório. Com
+    'cancelar', os relatórios que os processos ainda não começaram são descartados.
+    """
+    avisar = _Andamento(progress, cancelar)
+
+    relatorios = expandir_relatorios(entradas)
+    if not relatorios:
+        raise FileNotFoundError(f"Nenhum relatório de clash encontrado em: {entradas}")
+
+    instrumentacao = Instrumentacao()
+    with instrumentacao.etapa('regras'):
+        regras = carregar_regras(matrix_path)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(relatorios)))
+    avisar(0, f"Processando {len(relatorios)} relatórios de clash...")
+
+    if workers == 1:
+        _iniciar_worker_lote(regras, cache_dir)
+        resultados = map(_processar_relatorio_lote, relatorios)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker_lote,
+                                       initargs=(regras, cache_dir))
+        resultados = executor.map(_processar_relatorio_lote, relatorios)
+
+    # Junta os resultados na ordem dos relatórios; o andamento é medido em bytes lidos
+    tamanhos = [os.path.getsize(caminho) for caminho in relatorios]
+    andamento = _faixa_progresso(avisar, 0, 55, "Processando relatórios de clash...")
+    lidos = 0
+    juntos = ([], [], [], [], [])
+    origem = {}  # id(clash) -> nome do relatório (IDs por relatório e histórico no banco)
+    with instrumentacao.etapa('leitura_e_classificacao', entrada=len(relatorios),
+                              bytes=sum(tamanhos), workers=workers) as etapa:
+        try:
+            for indice, (listas, falhas) in enumerate(resultados, start=1):
+                for lista, parcial in zip(juntos, listas):
+                    lista.extend(parcial)
+                nome = os.path.splitext(os.path.basename(relatorios[indice - 1]))[0]
+                for lista in listas[:2]:
+                    origem.update(dict.fromkeys(map(id, lista), nome))
+                if executor is not None:
+                    instrumentacao.falhas_extracao.update(falhas)
+                lidos += tamanhos[indice - 1]
+                andamento(lidos, sum(tamanhos))
+        finally:
+            if executor is not None:
+                # Em caso de erro ou cancelamento, os relatórios que ainda não começaram são descartados
+                executor.shutdown(cancel_futures=True)
+        etapa['saida'] = len(juntos[0]) + len(juntos[1])
+        etapa['aprovados'] = len(juntos[3])
+        etapa['excecoes'] = len(juntos[4])
+
+    duplicados = []
+    if dedup or dedup_distancia is not None:
+        # Remove os repetidos do conjunto completo e das listas já classificadas
+        with instrumentacao.etapa('deduplicacao', entrada=len(juntos[0])) as etapa:
+            unicos, duplicados = deduplicar_clashs(juntos[0], dedup_distancia)
+            manter = {id(clash) for clash in unicos}
+            juntos = (unicos, juntos[1]) + tuple([clash for clash in lista if id(clash) in manter]
+                                                 for lista in juntos[2:])
+            etapa['saida'] = len(unicos)
+
+    avisar(55, "Relacionando conflitos por disciplina...")
+    resumo = gerar_saidas(*juntos, out_dir, avisar, instrumentacao, dxf=dxf, banco=banco,
+                          teste=lambda clash: origem[id(clash)],
+                          nome_matriz=_nome_matriz(matrix_path), relatorios=len(relatorios))
+    resumo['relatorios'] = len(relatorios)
+    resumo['duplicados'] = len(duplicados)
+    instrumentacao.gravar(os.path.join(out_dir, ARQUIVO_RELATORIO_EXECUCAO),
+                          relatorios=[os.path.abspath(caminho) for caminho in relatorios],
+                          resumo=resumo)
+    return resumo
+
+if __name__ == "__main__":
+    # A linha de comando fica em clash_cli, que importa este módulo pelo nome: as classes
+    # (Clash, regras) continuam serializadas como clash_pipeline.* no cache e no modo lote
+    from clash_cli import main
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import sys
+from array import array
+from collections import Counter
+
+# ============================================================
+# Tabela colunar das propriedades dos itens (CCR_*) dos clashs.
+# Cada bloco 'Item 1' / 'Item 2' do relatório traz propriedades como
+# 'E_Requisitos Específicos CCR_ClasseTubo'. Em vez de um dicionário por item, cada
+# propriedade vira uma coluna esparsa: apenas os itens com valor preenchido ocupam
+# espaço (índice do item + código do valor em arrays compactos) e os valores repetidos
+# são guardados uma única vez por coluna. Agregações como "clashs por CCR_ClasseTubo"
+# percorrem só os arrays da coluna.
+#
+# Uso:
+#     tabela = TabelaPropriedades()
+#     clashs, disciplinas, problematicos = process_clash_file(caminho, propriedades=tabela)
+#     tabela.contar_clashs_por('CCR_ClasseTubo')
+# ============================================================
+
+# ------------------------------------------------------------
+# Classe: ColunaPropriedade
+# Propósito: Coluna esparsa de uma propriedade: linhas (itens) com valor e o código de
+# cada valor no dicionário de valores da coluna.
+# ------------------------------------------------------------
+class ColunaPropriedade:
+    __slots__ = ('nome', 'linhas', 'codigos', 'valores', '_codigo_por_valor')
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.linhas = array('I')   # Índice do item (linha da tabela) de cada valor
+        self.codigos = array('I')  # Código do valor em 'valores'
+        self.valores = []          # Valores distintos, na ordem em que aparecem
+        self._codigo_por_valor = {}
+
+    def adicionar(self, linha, valor):
+        codigo = self._codigo_por_valor.get(valor)
+        if codigo is None:
+            codigo = self._codigo_por_valor[valor] = len(self.valores)
+            self.valores.append(sys.intern(valor))
+        self.linhas.append(linha)
+        self.codigos.append(codigo)
+
+    def __len__(self):
+        return len(self.linhas)
+
+# ------------------------------------------------------------
+# Classe: TabelaPropriedades
+# Propósito: Conjunto das colunas de propriedades dos itens de um ou mais relatórios.
+# Cada linha da tabela é um item (clash + número do item, 1 ou 2).
+# ------------------------------------------------------------
+class TabelaPropriedades:
+    """
+    Tabela das propriedades dos itens, preenchida pelo parser (veja iter_clashes).
+
+    'filtro' seleciona as propriedades guardadas: só entram as chaves que contêm esse
+    texto (padrão: 'CCR_'). Valores vazios não são guardados.
+    """
+
+    def __init__(self, filtro='CCR_'):
+        self.filtro = filtro
+        self.nomes = []                  # Nome do clash de cada registro com propriedades
+        self.registro_da_linha = array('I')
+        self.item_da_linha = array('B')
+        self.colunas = {}                # nome da propriedade -> ColunaPropriedade
+        self._ultimo_clash = None        # Clash e item da última linha criada (o clash é
+        self._ultimo_item = 0            # comparado por identidade, não guardado na tabela)
+
+    def __len__(self):
+        return len(self.registro_da_linha)
+
+    def aceita(self, chave):
+        return self.filtro in chave
+
+    def adicionar(self, clash, item, chave, valor):
+        """Registra a propriedade 'chave' = 'valor' do item (1 ou 2) do clash."""
+        if not valor:
+            return
+        if clash is not self._ultimo_clash:
+            self.nomes.append(clash.name)
+            self._ultimo_clash = clash
+            self._ultimo_item = 0
+        if item != self._ultimo_item:
+            self.registro_da_linha.append(len(self.nomes) - 1)
+            self.item_da_linha.append(item)
+            self._ultimo_item = item
+        coluna = self.colunas.get(chave)
+        if coluna is None:
+            coluna = self.colunas[chave] = ColunaPropriedade(sys.intern(chave))
+        coluna.adicionar(len(self.registro_da_linha) - 1, valor)
+
+    def colunas_de(self, propriedade):
+        """
+        Colunas da propriedade: o nome completo ('E_Requisitos Específicos CCR_ClasseTubo')
+        ou apenas o final ('CCR_ClasseTubo'), que reúne todas as colunas com esse nome.
+        """
+        if propriedade in self.colunas:
+            return [self.colunas[propriedade]]
+        return [coluna for nome, coluna in self.colunas.items()
+                if nome.endswith(' ' + propriedade)]
+
+    def contar_clashs_por(self, propriedade):
+        """
+        Counter valor -> quantidade de clashs com esse valor na propriedade (em qualquer
+        um dos dois itens). Um clash conta uma vez por valor.
+        """
+        vistos = set()
+        for coluna in self.colunas_de(propriedade):
+            registros = self.registro_da_linha
+            for linha, codigo in zip(coluna.linhas, coluna.codigos):
+                vistos.add((coluna.valores[codigo], registros[linha]))
+        return Counter(valor for valor, _ in vistos)
+
+    def contar_itens_por(self, propriedade):
+        """Counter valor -> quantidade de itens com esse valor na propriedade."""
+        contagem = Counter()
+        for coluna in self.colunas_de(propriedade):
+            for codigo, quantidade in Counter(coluna.codigos).items():
+                contagem[coluna.valores[codigo]] += quantidade
+        return contagem
+
+    def clashs_com(self, propriedade, valor):
+        """Nomes dos clashs (na ordem do relatório) com 'valor' na propriedade em algum dos itens."""
+        registros = set()
+        for coluna in self.colunas_de(propriedade):
+            try:
+                codigo = coluna.valores.index(valor)
+            except ValueError:
+                continue
+            registros.update(self.registro_da_linha[linha]
+                             for linha, atual in zip(coluna.linhas, coluna.codigos) if atual == codigo)
+        return [self.nomes[registro] for registro in sorted(registros)]
+
+    def valores(self, propriedade):
+        """Gera (nome do clash, item, valor) de cada item preenchido na propriedade."""
+        for coluna in self.colunas_de(propriedade):
+            for linha, codigo in zip(coluna.linhas, coluna.codigos):
+                yield (self.nomes[self.registro_da_linha[linha]], self.item_da_linha[linha],
+                       coluna.valores[codigo])
+
+    def resumo(self):
+        """Lista (propriedade, itens preenchidos, valores distintos) de cada coluna."""
+        return [(nome, len(coluna), len(coluna.valores)) for nome, coluna in self.colunas.items()]
@@ -0,0 +1,184 @@
+import os
+import uuid
+from collections import defaultdict
+
+from clash_pipeline import como_clash
+
+# ============================================================
+# Arquivos de texto das saídas: um TXT por disciplina com os clashs aprovados (lido
+# pelo lisp_test/criar2.lsp para inserir os blocos no AutoCAD) e o 'defeitos.txt' com
+# os clashs que não têm todas as informações obrigatórias.
+# ============================================================
+
+# ------------------------------------------------------------
+# Classe: EscritorTxtDisciplinas
+# Propósito: Escrever os arquivos de texto por disciplina de uma execução mantendo um
+# único arquivo bufferizado aberto por disciplina. Cada arquivo é escrito em um
+# temporário e renomeado para '<disciplina>.txt' no final (escrita atômica).
+# ------------------------------------------------------------
+class EscritorTxtDisciplinas:
+    """
+    Escritor dos TXTs por disciplina. Use como gerenciador de contexto:
+
+        with EscritorTxtDisciplinas(diretorio_saida) as escritor:
+            for clash in clashs:
+                escritor.escrever(clash)
+
+    O controle de clashs já escritos é do próprio escritor (por execução). Se ocorrer
+    um erro, os temporários são descartados e os arquivos anteriores ficam intactos.
+
+    Com 'saidas' (SaidasPendentes), os arquivos fechados ficam pendentes e só são
+    publicados junto com as demais saídas da execução.
+
+    Os IDs das imagens (cdNNNNNN) recomeçam em cada relatório. Ao juntar vários
+    relatórios, 'relatorio' (função clash -> nome do relatório) faz o controle usar o
+    par (relatório, ID), para que clashs de testes diferentes com o mesmo ID não se
+    percam.
+    """
+
+    def __init__(self, diretorio_saida, buffer=1 << 20, relatorio=None, saidas=None):
+        # Cria o diretório de saída, se ele não existir.
+        os.makedirs(diretorio_saida, exist_ok=True)
+        self.diretorio_saida = diretorio_saida
+        self.buffer = buffer
+        self.relatorio = relatorio
+        self.saidas = saidas
+        self._arquivos = {}  # disciplina -> (arquivo aberto, caminho temporário)
+        # Rastreia os clashs já escritos: cada disciplina mapeia para um conjunto de IDs
+        # (ou de pares (relatório, ID), com 'relatorio')
+        self.clashs_contados = defaultdict(set)
+
+    def _arquivo(self, disciplina):
+        aberto = self._arquivos.get(disciplina)
+        if aberto is None:
+            if self.saidas is not None:
+                temporario = self.saidas.temporario(f"{disciplina}.txt")
+            else:
+                temporario = os.path.join(self.diretorio_saida, f".{disciplina}.{uuid.uuid4().hex}.tmp")
+            aberto = (open(temporario, 'w', encoding='utf-8', buffering=self.buffer), temporario)
+            self._arquivos[disciplina] = aberto
+        return aberto[0]
+
+    def escrever(self, clash):
+        clash = como_clash(clash)
+        # Extração dos dados relevantes do clash.
+        # Caso o campo não exista (None), um valor vazio ('') é usado.
+        disp_1   = clash.disciplina_1 or ''   # Primeira disciplina envolvida
+        disp_2   = clash.disciplina_2 or ''   # Segunda disciplina envolvida
+        id_clash = clash.id or ''             # Identificador do clash no seu relatório
+        chave = id_clash if self.relatorio is None else (self.relatorio(clash), id_clash)
+
+        # Para cada disciplina envolvida (um clash pode envolver duas, ex: Topografia e Geometria)
+        # verifica se o clash ainda não foi escrito no arquivo daquela disciplina.
+        pendentes = [disciplina for disciplina in (disp_1, disp_2)
+                     if disciplina and chave not in self.clashs_contados[disciplina]]
+        if not pendentes:
+            return
+
+        # Conteúdo do clash, uma informação por linha. Exemplo de layout:
+        #
+        #   X: 100.0
+        #   Y: 200.0
+        #   Z: 50.0
+        #   Objetos: Topografia X Geometria
+        #   ID: 12345
+        #   Entity1: 9876
+        #   Entity2: 5432
+        #   Layer1: L1
+        #   Layer2: L2
+        #   ----------------------------------------
+        conteudo = f"X: {clash.coord_x or ''}\n" \
+                   f"Y: {clash.coord_y or ''}\n" \
+                   f"Z: {clash.coord_z or ''}\n" \
+                   f"Objetos: {disp_1} X {disp_2}\n" \
+                   f"ID: {id_clash}\n" \
+                   f"Entity1: {clash.entity_1 or ''}\n" \
+                   f"Entity2: {clash.entity_2 or ''}\n" \
+                   f"Layer1: {clash.layer_1 or ''}\n" \
+                   f"Layer2: {clash.layer_2 or ''}\n" \
+                   f"{'-'*40}\n"
+
+        for disciplina in pendentes:
+            # Um mesmo clash só é escrito uma vez por disciplina
+            if chave not in self.clashs_contados[disciplina]:
+                self._arquivo(disciplina).write(conteudo)
+                self.clashs_contados[disciplina].add(chave)
+
+    def fechar(self):
+        """Fecha os arquivos e os renomeia para '<disciplina>.txt' (com 'saidas', deixa pendentes)."""
+        arquivos, self._arquivos = self._arquivos, {}
+        for disciplina, (arquivo, temporario) in arquivos.items():
+            arquivo.close()
+            if self.saidas is None:
+                os.replace(temporario, os.path.join(self.diretorio_saida, f"{disciplina}.txt"))
+
+    def descartar(self):
+        """Fecha e apaga os temporários, sem tocar nos arquivos finais."""
+        arquivos, self._arquivos = self._arquivos, {}
+        for arquivo, temporario in arquivos.values():
+            arquivo.close()
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        if tipo is None:
+            self.fechar()
+        else:
+            self.descartar()
+        return False
+
+# Intervalo (em clashs) entre os avisos de andamento da escrita
+_CLASHS_POR_AVISO = 8192
+
+# ------------------------------------------------------------
+# Função: criar_txts_por_disciplina
+# Propósito: Para cada registro de clash, escreve o clash nos arquivos de texto
+# separados por disciplina (um arquivo por disciplina, gerado do zero a cada execução).
+# 'clashs_total' pode ser uma lista ou um gerador; sem tamanho conhecido, 'progresso'
+# recebe total None e o andamento é avisado pela contagem de clashs. 'relatorio' é
+# repassado ao EscritorTxtDisciplinas (clashs de vários relatórios), assim como 'saidas'.
+# ------------------------------------------------------------
+def criar_txts_por_disciplina(clashs_total, diretorio_saida, progresso=None, relatorio=None,
+                              saidas=None):
+    total = len(clashs_total) if hasattr(clashs_total, '__len__') else None
+    with EscritorTxtDisciplinas(diretorio_saida, relatorio=relatorio, saidas=saidas) as escritor:
+        for indice, clash in enumerate(clashs_total):
+            if progresso is not None and indice % _CLASHS_POR_AVISO == 0:
+                progresso(indice, total)
+            escritor.escrever(clash)
+    # Quantidade de registros escritos (um clash conta uma vez por disciplina)
+    return sum(len(ids) for ids in escritor.clashs_contados.values())
+
+# ------------------------------------------------------------
+# Função: criar_txt_defeitos
+# Propósito: Cria um único arquivo 'defeitos.txt' com detalhes dos clashs
+# que não possuem todas as informações obrigatórias. Com 'saidas' (SaidasPendentes), o
+# arquivo é publicado junto com as demais saídas.
+# ------------------------------------------------------------
+def criar_txt_defeitos(clashs_problematicos, diretorio_saida, saidas=None):
+    os.makedirs(diretorio_saida, exist_ok=True)
+    if saidas is not None:
+        caminho_defeitos = saidas.temporario("defeitos.txt")
+    else:
+        caminho_defeitos = os.path.join(diretorio_saida, "defeitos.txt")
+    
+    with open(caminho_defeitos, 'w', encoding='utf-8') as txt_file:
+        for clash in clashs_problematicos:
+            conteudo = f"Nome: {clash.get('name', 'N/A')}\n"
+            conteudo += f"ID: {clash.get('id', 'N/A')}\n"
+            conteudo += f"Coord X: {clash.get('coord_x', 'N/A')}\n"
+            conteudo += f"Coord Y: {clash.get('coord_y', 'N/A')}\n"
+            conteudo += f"Coord Z: {clash.get('coord_z', 'N/A')}\n"
+            conteudo += f"Disciplina 1: {clash.get('disciplina_1', 'N/A')}\n"
+            conteudo += f"Disciplina 2: {clash.get('disciplina_2', 'N/A')}\n"
+            conteudo += f"Entity 1: {clash.get('entity_1', 'N/A')}\n"
+            conteudo += f"Entity 2: {clash.get('entity_2', 'N/A')}\n"
+            conteudo += f"Layer 1: {clash.get('layer_1', 'N/A')}\n"
+            conteudo += f"Layer 2: {clash.get('layer_2', 'N/A')}\n"
+            conteudo += "-"*40 + "\n"
+            txt_file.write(conteudo)
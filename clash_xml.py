@@ -0,0 +1,132 @@
+import sys
+import xml.etree.ElementTree as ET
+
+from clash_pipeline import Clash, extract_disciplina
+
+# ============================================================
+# Leitura do relatório de clash exportado pelo Navisworks em XML.
+# Cada <clashresult> vira um Clash igual ao do relatório em texto:
+# - href (imagem) -> ID do clash; distance e <resultstatus> -> distância e status
+# - <clashpoint><pos3f x y z/> -> coordenadas
+# - <clashobject> 1 e 2 -> layer, entity handle e disciplina (pelo <pathlink>, montado
+#   como a linha 'Path:' do relatório em texto para usar extract_disciplina)
+# O arquivo é lido com iterparse e cada clashresult é descartado depois de convertido,
+# então a memória não depende do tamanho do relatório.
+# ============================================================
+
+# Intervalo (em clashs) entre os avisos de andamento da leitura
+_CLASHS_POR_AVISO = 256
+
+def _texto(elemento, caminho):
+    encontrado = elemento.find(caminho)
+    if encontrado is None or encontrado.text is None:
+        return None
+    return encontrado.text.strip()
+
+def _atributo_objeto(objeto, nomes):
+    """Valor do primeiro objectattribute/smarttag do objeto cujo <name> está em 'nomes'."""
+    for marcador in ('objectattribute', 'smarttags/smarttag'):
+        for atributo in objeto.iterfind(marcador):
+            if _texto(atributo, 'name') in nomes:
+                valor = _texto(atributo, 'value')
+                if valor:
+                    return valor
+    return None
+
+def _ler_propriedades(clash, numero, objeto, propriedades):
+    """Entrega à tabela de propriedades os objectattribute/smarttag aceitos do objeto."""
+    for marcador in ('objectattribute', 'smarttags/smarttag'):
+        for atributo in objeto.iterfind(marcador):
+            chave = _texto(atributo, 'name')
+            if chave and propriedades.aceita(chave):
+                propriedades.adicionar(clash, numero, chave, _texto(atributo, 'value') or '')
+
+def _ler_objeto(clash, numero, objeto):
+    """Preenche no clash os dados do <clashobject> 'numero' (1 ou 2)."""
+    # Layer: elemento <layer> ou a smart tag 'Item Layer'; sem layer o item fica
+    # 'Layer_vazio', como no relatório em texto
+    layer = _texto(objeto, 'layer') or _atributo_objeto(objeto, ('Item Layer', 'Layer'))
+    setattr(clash, f'layer_{numero}', sys.intern(layer) if layer else 'Layer_vazio')
+
+    # Entity handle e disciplina ocupam a primeira posição livre, como no parser do
+    # relatório em texto, para que os dois formatos gerem os mesmos registros
+    handle = _atributo_objeto(objeto, ('Entity Handle', 'Item Entity Handle'))
+    if handle:
+        if clash.entity_1 is None:
+            clash.entity_1 = handle
+        else:
+            clash.entity_2 = handle
+
+    nos = [no.text or '' for no in objeto.iterfind('pathlink/node')]
+    if nos:
+        disciplina = extract_disciplina('Path:\t' + '>'.join(nos))
+        if disciplina:
+            if clash.disciplina_1 is None:
+                clash.disciplina_1 = disciplina
+            else:
+                clash.disciplina_2 = disciplina
+
+# ------------------------------------------------------------
+# Função: clash_de_elemento
+# Propósito: Converte um elemento <clashresult> em Clash. 'propriedades', se informado,
+# recebe as propriedades dos itens (veja clash_propriedades).
+# ------------------------------------------------------------
+def clash_de_elemento(elemento, propriedades=None):
+    clash = Clash(elemento.get('name'))
+
+    href = elemento.get('href')
+    if href:
+        nome_imagem = href.replace('/', '\\').rsplit('\\', 1)[-1]
+        clash.id = nome_imagem.split('.', 1)[0].strip()
+        clash.definir_imagem(href, clash.id)
+
+    distancia = elemento.get('distance')
+    if distancia is not None:
+        clash.definir_distancia(distancia)
+    status = _texto(elemento, 'resultstatus') or elemento.get('status')
+    if status:
+        clash.status = sys.intern(status)
+
+    ponto = elemento.find('clashpoint/pos3f')
+    if ponto is not None:
+        clash.definir_ponto(ponto.get('x'), ponto.get('y'), ponto.get('z'))
+
+    for numero, objeto in enumerate(elemento.iterfind('clashobjects/clashobject'), start=1):
+        if numero > 2:
+            break
+        _ler_objeto(clash, numero, objeto)
+        if propriedades is not None:
+            _ler_propriedades(clash, numero, objeto, propriedades)
+    return clash
+
+# ------------------------------------------------------------
+# Função: iter_clashes_xml
+# Propósito: Gera, um a um, os clashs do relatório XML (na ordem do arquivo, inclusive
+# os que estão dentro de <clashgroup>). 'progresso', se informado, é chamado
+# periodicamente como progresso(bytes_lidos, tamanho_do_arquivo).
+# ------------------------------------------------------------
+def iter_clashes_xml(filepath, progresso=None, propriedades=None):
+    with open(filepath, 'rb') as arquivo:
+        tamanho = arquivo.seek(0, 2)
+        arquivo.seek(0)
+        pilha = []  # Elementos abertos, para remover cada clashresult do seu pai
+        lidos = 0
+        for evento, elemento in ET.iterparse(arquivo, events=('start', 'end')):
+            if evento == 'start':
+                pilha.append(elemento)
+                continue
+            pilha.pop()
+            if elemento.tag != 'clashresult':
+                continue
+
+            yield clash_de_elemento(elemento, propriedades)
+
+            # Libera o clash já convertido: limpa o elemento e o retira do pai
+            elemento.clear()
+            if pilha:
+                pilha[-1].remove(elemento)
+            lidos += 1
+            if progresso is not None and lidos % _CLASHS_POR_AVISO == 0:
+                progresso(arquivo.tell(), tamanho)
+        if progresso is not None:
+            progresso(tamanho, tamanho)
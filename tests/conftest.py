@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# ============================================================
+# Configuração comum dos testes de regressão.
+# Os módulos do projeto ficam na raiz do repositório (sem pacote), então a raiz entra
+# no sys.path. 'dados/relatorio_regressao.txt' é um relatório sintético com as layers
+# da 'Matriz Clashs.xlsx' (sem curingas); 'dados/esperado' tem as saídas da versão
+# original do Clash_Analizer para esse relatório e essa matriz.
+# ============================================================
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados')
+
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+@pytest.fixture
+def relatorio():
+    return os.path.join(DADOS, 'relatorio_regressao.txt')
+
+@pytest.fixture
+def matriz():
+    return os.path.join(RAIZ, 'Matriz Clashs.xlsx')
+
+@pytest.fixture
+def esperado():
+    return os.path.join(DADOS, 'esperado')
+
+@pytest.fixture(autouse=True)
+def cache_isolado(tmp_path, monkeypatch):
+    # O cache das regras fica no diretório de cache do usuário: nos testes, em tmp_path
+    monkeypatch.delenv('LOCALAPPDATA', raising=False)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache_usuario'))
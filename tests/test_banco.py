@@ -0,0 +1,60 @@
+import re
+import shutil
+import sqlite3
+
+from clash_banco import historico_clash
+from clash_pipeline import run_pipeline
+
+# ============================================================
+# Histórico SQLite: cada execução do pipeline com 'banco' acrescenta uma linha em
+# 'execucoes' e o estado de cada clash em 'historico'; a tabela 'clashs' guarda um
+# registro por (teste, name), atualizado a cada execução (upsert), sem duplicar.
+# ============================================================
+
+def alterar_clash(caminho, name, status=None, remover=False):
+    """Reescreve o relatório mudando o HardStatus de um clash ou removendo o registro."""
+    with open(caminho, encoding='utf-8') as arquivo:
+        texto = arquivo.read()
+    registro = re.compile(r'Name:\t%s\n.*?-{18}\n' % re.escape(name), re.S)
+    if remover:
+        texto, substituicoes = registro.subn('', texto)
+    else:
+        texto, substituicoes = registro.subn(
+            lambda m: re.sub(r'HardStatus:\t\w+', f'HardStatus:\t{status}', m.group(0)), texto)
+    assert substituicoes == 1
+    with open(caminho, 'w', encoding='utf-8', newline='\n') as arquivo:
+        arquivo.write(texto)
+
+def test_historico_com_upsert(relatorio, matriz, tmp_path):
+    copia = tmp_path / 'Teste Regressao.txt'
+    shutil.copy(relatorio, copia)
+    banco = str(tmp_path / 'historico.sqlite')
+
+    primeira = run_pipeline(str(copia), matriz, str(tmp_path / 'saida1'), banco=banco)
+    alterar_clash(copia, 'Clash1', status='Resolved')
+    alterar_clash(copia, 'Clash2', remover=True)
+    segunda = run_pipeline(str(copia), matriz, str(tmp_path / 'saida2'), banco=banco)
+    assert (primeira['execucao'], segunda['execucao']) == (1, 2)
+
+    conexao = sqlite3.connect(banco)
+    try:
+        assert conexao.execute('SELECT execucao, relatorios, clashs FROM execucoes '
+                               'ORDER BY execucao').fetchall() == [(1, 1, 300), (2, 1, 299)]
+        # Um registro por clash, mesmo depois de duas execuções
+        assert conexao.execute('SELECT COUNT(*), COUNT(DISTINCT name) FROM clashs').fetchone() == (300, 300)
+        assert conexao.execute('SELECT COUNT(*) FROM historico').fetchone() == (599,)
+        assert conexao.execute('SELECT DISTINCT teste FROM clashs').fetchall() == [('Teste Regressao',)]
+
+        # Clash presente nas duas execuções: primeira e última execução, estado atualizado
+        assert conexao.execute("SELECT primeira_execucao, ultima_execucao, status FROM clashs "
+                               "WHERE name = 'Clash1'").fetchone() == (1, 2, 'Resolved')
+        historico = historico_clash(conexao, 'Teste Regressao', 'Clash1')
+        assert [linha[0] for linha in historico] == [1, 2]
+        assert historico[0][2] != 'Resolved' and historico[1][2] == 'Resolved'
+
+        # Clash que saiu do relatório: continua no banco com a última execução em que apareceu
+        assert conexao.execute("SELECT primeira_execucao, ultima_execucao FROM clashs "
+                               "WHERE name = 'Clash2'").fetchone() == (1, 1)
+        assert [linha[0] for linha in historico_clash(conexao, 'Teste Regressao', 'Clash2')] == [1]
+    finally:
+        conexao.close()
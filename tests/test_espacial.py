@@ -0,0 +1,71 @@
+import math
+import os
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from clash_espacial import IndiceEspacial
+from clash_pipeline import process_clash_file
+
+# ============================================================
+# As consultas do índice espacial (grade uniforme em XY) precisam dar o mesmo resultado
+# de uma busca exaustiva sobre todos os pontos, com o tamanho de célula automático e
+# com células bem menores e bem maiores que o espaçamento dos pontos.
+# ============================================================
+
+@pytest.fixture(scope='module')
+def clashs():
+    relatorio = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados',
+                             'relatorio_regressao.txt')
+    completos, _, problematicos = process_clash_file(relatorio)
+    return [clash for clash in completos + problematicos if clash.x is not None]
+
+def distancia(clash, x, y, z=None):
+    if z is None:
+        return math.hypot(clash.x - x, clash.y - y)
+    return math.sqrt((clash.x - x) ** 2 + (clash.y - y) ** 2 + (clash.z - z) ** 2)
+
+def consultas(quantidade=25):
+    sorteio = random.Random(42)
+    return [(sorteio.uniform(619950, 620450), sorteio.uniform(491950, 492450),
+             sorteio.uniform(-10, 310)) for _ in range(quantidade)]
+
+@pytest.fixture(params=[None, 0.5, 5000.0], ids=['automatica', 'pequena', 'grande'])
+def indice(request, clashs):
+    return IndiceEspacial(clashs, tamanho_celula=request.param)
+
+@pytest.mark.parametrize('com_z', [False, True])
+def test_raio_igual_a_busca_exaustiva(indice, clashs, com_z):
+    for x, y, z in consultas():
+        z = z if com_z else None
+        for raio in (15.0, 60.0, 250.0):
+            esperado = sorted((distancia(clash, x, y, z), id(clash)) for clash in clashs
+                              if distancia(clash, x, y, z) <= raio)
+            resultado = indice.raio(x, y, raio, z=z)
+            assert [id(clash) for _, clash in resultado] == [i for _, i in esperado]
+            assert [d for d, _ in resultado] == pytest.approx([d for d, _ in esperado])
+
+def test_caixa_igual_a_busca_exaustiva(indice, clashs):
+    sorteio = random.Random(7)
+    for _ in range(25):
+        xmin, xmax = sorted(sorteio.uniform(619950, 620450) for _ in range(2))
+        ymin, ymax = sorted(sorteio.uniform(491950, 492450) for _ in range(2))
+        zmin, zmax = sorted(sorteio.uniform(0, 300) for _ in range(2))
+        esperado = [clash for clash in clashs
+                    if xmin <= clash.x <= xmax and ymin <= clash.y <= ymax]
+        assert [id(c) for c in indice.caixa(xmin, ymin, xmax, ymax)] == [id(c) for c in esperado]
+        esperado = [clash for clash in esperado if zmin <= clash.z <= zmax]
+        assert [id(c) for c in indice.caixa(xmin, ymin, xmax, ymax, zmin, zmax)] == \
+            [id(c) for c in esperado]
+
+@pytest.mark.parametrize('com_z', [False, True])
+def test_vizinhos_igual_a_busca_exaustiva(indice, clashs, com_z):
+    for x, y, z in consultas():
+        z = z if com_z else None
+        ordenados = sorted((distancia(clash, x, y, z), id(clash)) for clash in clashs)
+        for k in (1, 5, 40, len(clashs) + 10):
+            resultado = indice.vizinhos(x, y, k=k, z=z)
+            assert [id(clash) for _, clash in resultado] == [i for _, i in ordenados[:k]]
+            assert [d for d, _ in resultado] == pytest.approx([d for d, _ in ordenados[:k]])
@@ -0,0 +1,46 @@
+import pytest
+
+import clash_pipeline
+from clash_pipeline import dividir_relatorio, process_clash_file, process_clash_file_paralelo
+
+# ============================================================
+# A leitura em paralelo (--paralelo) divide o relatório em trechos que começam em uma
+# linha 'Name:'; juntando os trechos na ordem do arquivo, o resultado precisa ser o
+# mesmo da leitura sequencial, com quebras de linha LF ou CRLF.
+# ============================================================
+
+@pytest.fixture
+def sempre_paralelo(monkeypatch):
+    # O relatório de teste é pequeno: sem isso a leitura cairia na sequencial
+    monkeypatch.setattr(clash_pipeline, '_TAMANHO_MINIMO_PARALELO', 0)
+
+@pytest.fixture(params=['lf', 'crlf'])
+def relatorio_quebras(request, relatorio, tmp_path):
+    if request.param == 'lf':
+        return relatorio
+    with open(relatorio, 'rb') as arquivo:
+        conteudo = arquivo.read()
+    caminho = tmp_path / 'relatorio_crlf.txt'
+    caminho.write_bytes(conteudo.replace(b'\n', b'\r\n'))
+    return str(caminho)
+
+@pytest.mark.parametrize('workers', [2, 4])
+def test_paralelo_igual_ao_sequencial(relatorio_quebras, sempre_paralelo, workers):
+    clashs, disciplinas, problematicos = process_clash_file(relatorio_quebras)
+    assert len(clashs) == 230 and len(problematicos) == 70
+
+    # Vários trechos de fato, cada um começando em um registro
+    trechos = dividir_relatorio(relatorio_quebras, workers * clash_pipeline._TRECHOS_POR_WORKER)
+    assert len(trechos) > 1
+
+    paralelo = process_clash_file_paralelo(relatorio_quebras, workers=workers)
+    assert paralelo == (clashs, disciplinas, problematicos)
+
+def test_trechos_cobrem_o_arquivo(relatorio):
+    with open(relatorio, 'rb') as arquivo:
+        conteudo = arquivo.read()
+    trechos = dividir_relatorio(relatorio, 16)
+    assert trechos[0][0] == 0 and trechos[-1][1] == len(conteudo)
+    for (_, fim), (inicio, _) in zip(trechos, trechos[1:]):
+        assert fim == inicio
+        assert conteudo[inicio:].startswith(b'Name:')
@@ -0,0 +1,97 @@
+import os
+import shutil
+
+import openpyxl
+
+from clash_pipeline import run_batch, run_pipeline
+
+# ============================================================
+# Regressão das saídas: com uma matriz sem curingas, o pipeline precisa gravar os
+# mesmos TXTs (byte a byte) e a mesma planilha (valores, cores, bordas, mesclagens e
+# larguras) que a versão original. No modo lote, IDs de imagem repetidos entre
+# relatórios não podem sumir dos arquivos por disciplina.
+# ============================================================
+
+PLANILHA = 'lista_conflitos_disciplinas.xlsx'
+
+# ------------------------------------------------------------
+# Função: conteudo_planilha
+# Propósito: O que importa da planilha de conflitos para a comparação (o arquivo .xlsx
+# em si muda a cada gravação, por causa das datas internas).
+# ------------------------------------------------------------
+def conteudo_planilha(caminho):
+    workbook = openpyxl.load_workbook(caminho)
+    try:
+        aba = workbook.active
+        celulas = {}
+        for linha in aba.iter_rows():
+            for celula in linha:
+                cor = celula.fill.fgColor.rgb if celula.fill.fill_type else None
+                borda = celula.border.left.style
+                if celula.value is not None or cor or borda:
+                    celulas[celula.coordinate] = (celula.value, cor, borda)
+        mescladas = sorted(str(faixa) for faixa in aba.merged_cells.ranges)
+        larguras = {coluna: aba.column_dimensions[coluna].width for coluna in 'ABCDEF'}
+        return celulas, mescladas, larguras
+    finally:
+        workbook.close()
+
+def ler_bytes(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.read()
+
+def conferir_saidas(esperado, saida):
+    arquivos = sorted(os.listdir(esperado))
+    gerados = sorted(nome for nome in os.listdir(saida) if nome.endswith(('.txt', '.xlsx')))
+    assert gerados == arquivos
+    for nome in arquivos:
+        if nome == PLANILHA:
+            assert conteudo_planilha(os.path.join(saida, nome)) == \
+                conteudo_planilha(os.path.join(esperado, nome))
+        else:
+            assert ler_bytes(os.path.join(saida, nome)) == ler_bytes(os.path.join(esperado, nome)), nome
+
+def test_saidas_iguais_a_versao_original(relatorio, matriz, esperado, tmp_path):
+    resumo = run_pipeline(relatorio, matriz, str(tmp_path / 'saida'))
+    assert resumo['clashs'] == 230
+    assert resumo['problematicos'] == 70
+    conferir_saidas(esperado, str(tmp_path / 'saida'))
+
+def test_saidas_iguais_com_cache(relatorio, matriz, esperado, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    for execucao in ('primeira', 'segunda'):  # A segunda lê o relatório do cache
+        run_pipeline(relatorio, matriz, str(tmp_path / execucao), cache_dir=cache_dir)
+        conferir_saidas(esperado, str(tmp_path / execucao))
+    assert any(nome.endswith('.pickle') for nome in os.listdir(cache_dir))
+
+# ------------------------------------------------------------
+# Função: contar_inserts
+# Propósito: Número de marcadores (entidades INSERT) em um desenho DXF.
+# ------------------------------------------------------------
+def contar_inserts(caminho):
+    with open(caminho, encoding='cp1252') as arquivo:
+        linhas = arquivo.read().splitlines()
+    return sum(1 for codigo, valor in zip(linhas, linhas[1:])
+               if codigo.strip() == '0' and valor == 'INSERT')
+
+def test_lote_mantem_ids_repetidos_entre_relatorios(relatorio, matriz, tmp_path):
+    # Dois relatórios com os mesmos IDs de imagem: todos os clashs dos dois entram nas saídas
+    entradas = tmp_path / 'entradas'
+    entradas.mkdir()
+    shutil.copy(relatorio, entradas / 'a.txt')
+    shutil.copy(relatorio, entradas / 'b.txt')
+
+    unico = str(tmp_path / 'unico')
+    lote = str(tmp_path / 'lote')
+    run_pipeline(relatorio, matriz, unico, dxf=True)
+    resumo = run_batch(str(entradas), matriz, lote, workers=1, dxf=True)
+    assert resumo['relatorios'] == 2
+    assert resumo['clashs'] == 2 * 230
+
+    for nome in sorted(os.listdir(unico)):
+        if nome.endswith('.txt'):
+            # Os clashs de 'a' seguidos dos de 'b', na ordem dos relatórios
+            assert ler_bytes(os.path.join(lote, nome)) == 2 * ler_bytes(os.path.join(unico, nome)), nome
+        elif nome.endswith('.dxf'):
+            assert contar_inserts(os.path.join(lote, nome)) == \
+                2 * contar_inserts(os.path.join(unico, nome)) > 0, nome